@@ -0,0 +1,9 @@
+# Exportación de reportes por lotes sin interfaz:
+#   python export_reports.py --tutor correo --period "Ene-Abr 2025"
+# Igual que main.py, es una entrada ligera: los workers del pool de gráficas la
+# reimportan como __mp_main__ sin traer el caché ni Firebase.
+
+if __name__ == "__main__":
+    from services.batch_export import main
+
+    raise SystemExit(main())
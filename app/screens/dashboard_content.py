@@ -6,6 +6,8 @@ from flet import (
     BarChartRod, ChartAxis, ChartAxisLabel, ChartGridLines, Icons
 )
 from services.data_cache import DataCache
+from services.group_metrics import empty_metrics
+from screens.render_scheduler import interaction_scope, request_update
 import asyncio
 import time
 
@@ -325,114 +327,17 @@ class DashboardContent(Column):
         self.width = content_width
 
     def get_metrics_data(self, group):
-        """Calcula métricas, niveles y alertas para el grupo seleccionado usando DataCache"""
+        """Obtiene métricas, niveles y alertas precalculadas del grupo seleccionado desde DataCache"""
         try:
-            users = self.cache.get_users_by_group(group)
-            if not users:
+            metrics = self.cache.get_group_metrics(group)
+            if metrics["total_students"] == 0:
                 print(f"[DASHBOARD] No hay usuarios para el grupo {group}")
-                return {
-                    "total_students": 0,
-                    "bai_avg": 0,
-                    "bdi_avg": 0,
-                    "pss_avg": 0,
-                    "level_counts": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                    "alerts": [],
-                    "gender_groups": {},
-                    "age_groups": {}
-                }
-
-            total_students = len(users)
-            bai_scores, bdi_scores, pss_scores = [], [], []
-            level_counts = {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]}
-            alerts = []
-            gender_groups = {
-                "Masculino": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                "Femenino": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                "Otro": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]}
-            }
-            age_groups = {
-                "<18": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                "18-20": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                "21-23": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                ">23": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]}
-            }
-
-            for user in users:
-                user_id = user.get("doc_id", "")
-                name = user.get("name", "Sin nombre")
-                gender = user.get("gender", "Otro")
-                age = user.get("age", None)
-                age_key = (
-                    "<18" if age and age < 18 else
-                    "18-20" if age and 18 <= age <= 20 else
-                    "21-23" if age and 21 <= age <= 23 else
-                    ">23" if age and age > 23 else
-                    ">23"
-                )
-                responses = self.cache.get_user_responses(user_id)
-                latest_levels = {"BAI": 0, "BDI": 0, "PSS": 0}
-                questionnaires_alert = []
-
-                for response in sorted(responses, key=lambda x: x.get("timestamp", ""), reverse=True):
-                    questionnaire = response.get("questionnaire", "")
-                    level = response.get("level", 0)
-                    if questionnaire in latest_levels and latest_levels[questionnaire] == 0:
-                        latest_levels[questionnaire] = level
-                        if level >= 2:
-                            questionnaires_alert.append(f"{questionnaire} (Nivel {level})")
-                    if all(latest_levels[q] != 0 for q in ["BAI", "BDI", "PSS"]):
-                        break
-
-                for q, level in latest_levels.items():
-                    level_counts[q][level] += 1
-                    if gender in gender_groups:
-                        gender_groups[gender][q][level] += 1
-                    age_groups[age_key][q][level] += 1
-                    if q == "BAI" and level > 0:
-                        bai_scores.append(level * 10)
-                    elif q == "BDI" and level > 0:
-                        bdi_scores.append(level * 10)
-                    elif q == "PSS" and level > 0:
-                        pss_scores.append(level * 10)
-
-                if questionnaires_alert:
-                    alerts.append({
-                        "student_name": name,
-                        "questionnaires": ", ".join(questionnaires_alert),
-                        "highest_level": max(latest_levels.values())
-                    })
-
-            bai_avg = sum(bai_scores) / len(bai_scores) if bai_scores else 0
-            bdi_avg = sum(bdi_scores) / len(bdi_scores) if bdi_scores else 0
-            pss_avg = sum(pss_scores) / len(pss_scores) if pss_scores else 0
-
-            print(f"[DASHBOARD] Métricas para {group}: total={total_students}, BAI_avg={bai_avg:.2f}, BDI_avg={bdi_avg:.2f}, PSS_avg={pss_avg:.2f}, alertas={len(alerts)}")
-            print(f"[DASHBOARD] Niveles: {level_counts}")
-            print(f"[DASHBOARD] Grupos por género: {gender_groups}")
-            print(f"[DASHBOARD] Grupos por edad: {age_groups}")
-
-            return {
-                "total_students": total_students,
-                "bai_avg": bai_avg,
-                "bdi_avg": bdi_avg,
-                "pss_avg": pss_avg,
-                "level_counts": level_counts,
-                "alerts": alerts,
-                "gender_groups": gender_groups,
-                "age_groups": age_groups
-            }
+                return metrics
+            print(f"[DASHBOARD] Métricas para {group}: total={metrics['total_students']}, BAI_avg={metrics['bai_avg']:.2f}, BDI_avg={metrics['bdi_avg']:.2f}, PSS_avg={metrics['pss_avg']:.2f}, alertas={len(metrics['alerts'])}")
+            return metrics
         except Exception as e:
             print(f"[DASHBOARD] Error al calcular métricas para {group}: {str(e)}")
-            return {
-                "total_students": 0,
-                "bai_avg": 0,
-                "bdi_avg": 0,
-                "pss_avg": 0,
-                "level_counts": {"BAI": [0, 0, 0, 0], "BDI": [0, 0, 0, 0], "PSS": [0, 0, 0, 0]},
-                "alerts": [],
-                "gender_groups": {},
-                "age_groups": {}
-            }
+            return empty_metrics()
 
     def create_chart(self):
         """Crea un gráfico de barras con los niveles de los alumnos"""
@@ -566,7 +471,7 @@ class DashboardContent(Column):
             self.chart_container.content.controls[1].content = self.create_chart()
             print(f"[DASHBOARD] Filtros aplicados: género={self.gender_dropdown.value}, edad={self.age_dropdown.value}")
             if self.page:
-                self.page.update()
+                request_update(self.page)
             else:
                 print("[DASHBOARD] No se puede actualizar la página: self.page es None")
 
@@ -578,7 +483,7 @@ class DashboardContent(Column):
             self.chart_container.content.controls[1].content = self.create_chart()
             print("[DASHBOARD] Gráfico reiniciado")
             if self.page:
-                self.page.update()
+                request_update(self.page)
             else:
                 print("[DASHBOARD] No se puede actualizar la página: self.page es None")
 
@@ -597,25 +502,26 @@ class DashboardContent(Column):
         if self.is_updating:
             print("[DASHBOARD] Actualización en curso, cambio de grupo ignorado")
             return
-        self.is_updating = True
-        try:
-            self.selected_group = new_group
-            self.metrics_data = self.get_metrics_data(new_group)
-            await self.update_metrics_and_chart()
-            if self.on_group_change:
-                print(f"[DASHBOARD] Llamando on_group_change con grupo: {new_group}")
-                if asyncio.iscoroutinefunction(self.on_group_change):
-                    await self.on_group_change(new_group)
+        async with interaction_scope(self.page, "cambio de grupo (dashboard)"):
+            try:
+                self.selected_group = new_group
+                # update_metrics_and_chart marca is_updating por su cuenta
+                await self.update_metrics_and_chart()
+                self.is_updating = True
+                if self.on_group_change:
+                    print(f"[DASHBOARD] Llamando on_group_change con grupo: {new_group}")
+                    if asyncio.iscoroutinefunction(self.on_group_change):
+                        await self.on_group_change(new_group)
+                    else:
+                        self.on_group_change(new_group)
+            except Exception as e:
+                print(f"[DASHBOARD] Error al cambiar grupo {new_group}: {str(e)}")
+            finally:
+                self.is_updating = False
+                if self.page:
+                    request_update(self.page)
                 else:
-                    self.on_group_change(new_group)
-        except Exception as e:
-            print(f"[DASHBOARD] Error al cambiar grupo {new_group}: {str(e)}")
-        finally:
-            self.is_updating = False
-            if self.page:
-                self.page.update()
-            else:
-                print("[DASHBOARD] No se puede actualizar la página: self.page es None")
+                    print("[DASHBOARD] No se puede actualizar la página: self.page es None")
 
     async def update_metrics_and_chart(self):
         """Actualiza las métricas, gráfico y alertas"""
@@ -682,7 +588,7 @@ class DashboardContent(Column):
         finally:
             self.is_updating = False
             if self.page:
-                self.page.update()
+                request_update(self.page)
             else:
                 print("[DASHBOARD] No se puede actualizar la página: self.page es None")
 
@@ -690,7 +596,7 @@ class DashboardContent(Column):
         """Recarga los datos del caché y actualiza el dashboard"""
         try:
             print("[DASHBOARD] Recargando datos del caché")
-            await self.cache.load_all_data()
+            await self.cache.reload()
             self.groups = self.tutor_data.get('groups', [])
             self.group_dropdown.options = [dropdown.Option(group) for group in self.groups]
             self.group_dropdown.value = self.selected_group if self.selected_group in self.groups else (self.groups[0] if self.groups else None)
@@ -699,7 +605,15 @@ class DashboardContent(Column):
         except Exception as e:
             print(f"[DASHBOARD] Error al recargar datos: {str(e)}")
 
+    async def on_cache_change(self, changed):
+        """Refresca el dashboard cuando el caché en vivo recibe cambios relevantes"""
+        if not ({"users", "respuestas_cuestionarios"} & changed):
+            return
+        print(f"[DASHBOARD] Cambios en vivo recibidos: {changed}")
+        await self.update_metrics_and_chart()
+
     async def initialize(self):
         """Inicializa el dashboard"""
         print("[DASHBOARD] Ejecutando initialize")
+        self.cache.subscribe(self.on_cache_change)
         await self.update_metrics_and_chart()
\ No newline at end of file
@@ -1,19 +1,27 @@
 from flet import *
-from datetime import datetime, timezone
+from datetime import datetime
 import logging
 import asyncio
-from docx import Document
-from docx.shared import Inches, Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-import matplotlib.pyplot as plt
-import io
-import os
-import base64
+from services.report_service import generate_group_report
+from services.report_store import report_store
+from services.periods import MONTH_NAMES, cuatrimestre_range
+from services.student_series import QUESTIONNAIRE_ORDER, series_cache
+from screens.render_scheduler import interaction_scope, request_update
 
 # Configurar logging
 logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Alumnos por página en la lista y distancia al final (px) que carga la siguiente
+STUDENT_PAGE_SIZE = 50
+STUDENT_SCROLL_THRESHOLD = 200
+# Espera tras la última tecla antes de buscar (segundos)
+SEARCH_DEBOUNCE = 0.3
+# Filas por página en las tablas de registros detallados
+DETAIL_PAGE_SIZE = 20
+# Alumnos siguientes de la lista que se preparan en segundo plano
+PREFETCH_AHEAD = 3
+
 class TutorDarkMoodPalette:
     MAIN_BACKGROUND = "#1E252D"
     CARD_SURFACE = "#2A323C"
@@ -64,6 +72,23 @@ class FilterContent(Column):
             ),
             on_click=self.generate_report
         )
+        # Enlace de descarga del último reporte; se oculta cuando el reporte expira.
+        # El usuario lo abre con su clic: un launch_url tras la generación lo bloquean los navegadores
+        self.download_button = TextButton(
+            "Descargar reporte",
+            icon=Icons.DOWNLOAD,
+            icon_color=TutorDarkMoodPalette.TRUST,
+            tooltip="Descargar el último reporte generado",
+            visible=False
+        )
+        # Progreso de generación del reporte
+        self.report_progress = ProgressBar(
+            value=0,
+            width=120,
+            color=TutorDarkMoodPalette.TRUST,
+            bgcolor=TutorDarkMoodPalette.CARD_SURFACE,
+            visible=False
+        )
         # Dropdown de cuatrimestre dinámico
         self.cuatrimestre_dropdown = Dropdown(
             value=self.selected_cuatrimestre,
@@ -79,12 +104,35 @@ class FilterContent(Column):
             color=TutorDarkMoodPalette.TEXT_MAIN,
             on_change=self.on_cuatrimestre_change
         )
-        # Contenedor lista alumnos
-        self.student_list_container = Column(
+        # Búsqueda y lista paginada de alumnos: solo se envían al cliente las
+        # páginas que se van mostrando al desplazarse
+        self.student_query = ""
+        self.student_total = 0
+        self.student_loaded = 0
+        self.listed_students = []
+        self.loading_students = False
+        # Prefetch de los siguientes alumnos: paneles listos por id y contadores
+        self.prefetch_task = None
+        self.prefetched_panels = {}
+        self.prefetch_hits = 0
+        self.prefetch_misses = 0
+        self.student_search = TextField(
+            hint_text="Buscar por nombre o matrícula",
+            prefix_icon=Icons.SEARCH,
+            dense=True,
+            height=40,
+            text_size=13,
+            bgcolor=TutorDarkMoodPalette.CARD_SURFACE,
+            border_color=TutorDarkMoodPalette.BORDER_SUBTLE,
+            color=TutorDarkMoodPalette.TEXT_MAIN,
+            on_change=self.on_student_search
+        )
+        self.student_list_container = ListView(
             spacing=4,
-            scroll="auto",
-            height=400,  # Fixed height to match chart container
-            width=300   # Fixed width to maintain original size
+            height=380,
+            width=300,   # Fixed width to maintain original size
+            on_scroll_interval=100,
+            on_scroll=self.on_student_list_scroll
         )
         # Contenedor info alumno
         self.student_info_container = Container(
@@ -143,6 +191,8 @@ class FilterContent(Column):
             Row([
                 Text("Filtrado de alumnos", size=20, color=TutorDarkMoodPalette.TEXT_MAIN, expand=True),
                 self.group_dropdown,
+                self.report_progress,
+                self.download_button,
                 self.report_button
             ], alignment="spaceBetween"),
             Row([
@@ -152,7 +202,7 @@ class FilterContent(Column):
             Row([
                 self.historial_container,
                 Container(
-                    content=self.student_list_container,
+                    content=Column([self.student_search, self.student_list_container], spacing=6),
                     bgcolor=TutorDarkMoodPalette.CARD_SURFACE,
                     border=border.all(1, TutorDarkMoodPalette.BORDER_SUBTLE),
                     border_radius=8,
@@ -182,7 +232,7 @@ class FilterContent(Column):
             show_close_icon=True
         )
         self.page.snack_bar.open = True
-        self.page.update()
+        request_update(self.page)
 
     async def initialize(self):
         tutor_groups = self.tutor_data.get("groups", [])
@@ -194,7 +244,7 @@ class FilterContent(Column):
         self.group_dropdown.value = self.selected_group
         await self.update_group(self.selected_group)
         if self.page:
-            self.page.update()
+            request_update(self.page)
 
     def show_no_groups_message(self):
         message = Column([
@@ -212,60 +262,161 @@ class FilterContent(Column):
         ]
 
     async def update_group(self, new_group):
-        self.selected_group = new_group
-        self.selected_student = None
-        students = self.cache.get_users_by_group(new_group) if self.cache else []
-        await self.build_student_list(students)
-        if students:
-            await self.select_student(students[0])
-        else:
-            self.student_info_container.content = Column([Text(
-                f"No hay alumnos en el grupo {new_group}",
-                color=TutorDarkMoodPalette.TEXT_MAIN
-            )], scroll="auto")
-            self.recommendations_container.content = Column([Text(
-                "Selecciona un alumno para ver recomendaciones",
-                color=TutorDarkMoodPalette.TEXT_MAIN
-            )], scroll="auto")
-            self.chart_container.content = Text(
-                "No hay datos para mostrar",
-                color=TutorDarkMoodPalette.TEXT_MAIN
-            )
-        if self.page:
-            self.page.update()
+        async with interaction_scope(self.page, "cambio de grupo (filtrado)"):
+            self.cancel_prefetch()
+            self.selected_group = new_group
+            self.selected_student = None
+            self.student_query = ""
+            self.student_search.value = ""
+            students = await self.build_student_list()
+            if students:
+                await self.select_student(students[0])
+            else:
+                self.student_info_container.content = Column([Text(
+                    f"No hay alumnos en el grupo {new_group}",
+                    color=TutorDarkMoodPalette.TEXT_MAIN
+                )], scroll="auto")
+                self.recommendations_container.content = Column([Text(
+                    "Selecciona un alumno para ver recomendaciones",
+                    color=TutorDarkMoodPalette.TEXT_MAIN
+                )], scroll="auto")
+                self.chart_container.content = Text(
+                    "No hay datos para mostrar",
+                    color=TutorDarkMoodPalette.TEXT_MAIN
+                )
+            if self.page:
+                request_update(self.page)
+
+    async def refresh_data(self):
+        """Vuelve a leer del caché el grupo actual conservando el alumno seleccionado"""
+        self.cancel_prefetch()
+        students = await self.build_student_list()
+        selected_id = self.selected_student.get('doc_id') if self.selected_student else None
+        group_students = self.cache.get_users_by_group(self.selected_group) if self.cache else []
+        student = next((s for s in group_students if s.get('doc_id') == selected_id), students[0] if students else None)
+        if student:
+            await self.select_student(student)
+        elif self.page:
+            request_update(self.page)
 
-    async def build_student_list(self, students):
+    def create_student_tile(self, student):
+        return ListTile(
+            title=Text(student.get("name", "Nombre no disponible"),
+            color=TutorDarkMoodPalette.TEXT_MAIN),
+            subtitle=Text(student.get("student_id", ""),
+                         color=TutorDarkMoodPalette.TEXT_MAIN, size=12),
+            on_click=lambda e, s=student: self.page.run_task(self.select_student, s)
+        )
+
+    async def build_student_list(self):
+        """Reinicia la lista con la primera página de alumnos que coinciden con la búsqueda"""
         self.student_list_container.controls.clear()
+        self.student_loaded = 0
+        self.listed_students = []
+        if self.cache:
+            students, self.student_total = self.cache.search_group_users(self.selected_group, self.student_query, 0, STUDENT_PAGE_SIZE)
+        else:
+            students, self.student_total = [], 0
         if not students:
             self.student_list_container.controls.append(
-                Text("No hay alumnos en este grupo",
+                Text("Sin coincidencias" if self.student_query else "No hay alumnos en este grupo",
                     color=TutorDarkMoodPalette.TEXT_MAIN)
             )
+            return students
+        self.student_list_container.controls.extend(self.create_student_tile(s) for s in students)
+        self.student_loaded = len(students)
+        self.listed_students = list(students)
+        return students
+
+    async def load_more_students(self):
+        """Agrega la siguiente página de alumnos al final de la lista"""
+        if self.loading_students or self.student_loaded >= self.student_total:
             return
-        for student in students:
-            self.student_list_container.controls.append(
-                ListTile(
-                    title=Text(student.get("name", "Nombre no disponible"),
-                    color=TutorDarkMoodPalette.TEXT_MAIN),
-                    subtitle=Text(student.get("student_id", ""),
-                                 color=TutorDarkMoodPalette.TEXT_MAIN, size=12),
-                    on_click=lambda e, s=student: self.page.run_task(self.select_student, s)
-                )
+        self.loading_students = True
+        try:
+            students, self.student_total = self.cache.search_group_users(
+                self.selected_group, self.student_query, self.student_loaded, STUDENT_PAGE_SIZE
             )
+            self.student_list_container.controls.extend(self.create_student_tile(s) for s in students)
+            self.student_loaded += len(students)
+            self.listed_students.extend(students)
+            if self.page:
+                request_update(self.page)
+        finally:
+            self.loading_students = False
 
-    async def select_student(self, student):
-        self.selected_student = student
-        self.update_student_info(student)
-        self.update_recommendations(student)
-        self.chart_container.content = await self.create_chart(student.get('doc_id', ''), self.selected_cuatrimestre)
+    async def on_student_list_scroll(self, e):
+        if e.max_scroll_extent is not None and e.max_scroll_extent - e.pixels <= STUDENT_SCROLL_THRESHOLD:
+            await self.load_more_students()
+
+    async def on_student_search(self, e):
+        query = e.control.value or ""
+        self.student_query = query
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        if query != self.student_query:
+            return
+        await self.build_student_list()
         if self.page:
-            self.page.update()
+            request_update(self.page)
 
-    def update_student_info(self, student):
+    async def select_student(self, student):
+        async with interaction_scope(self.page, "seleccion de alumno"):
+            self.selected_student = student
+            student_id = student.get('doc_id', '')
+            panels = self.prefetched_panels.pop(student_id, None)
+            if panels is not None:
+                self.prefetch_hits += 1
+                self.student_info_container.content, self.recommendations_container.content = panels
+            else:
+                self.prefetch_misses += 1
+                self.update_student_info(student)
+                self.update_recommendations(student)
+            self.chart_container.content = await self.create_chart(student_id, self.selected_cuatrimestre)
+            logger.debug(f"[PREFETCH] Aciertos: {self.prefetch_hits}, fallos: {self.prefetch_misses}")
+            self.schedule_prefetch(student)
+            if self.page:
+                request_update(self.page)
+
+    def cancel_prefetch(self):
+        """Cancela el prefetch en curso y descarta lo preparado (cambio de grupo o de datos)"""
+        if self.prefetch_task is not None and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        self.prefetch_task = None
+        self.prefetched_panels = {}
+
+    def schedule_prefetch(self, student):
+        """Prepara en segundo plano los PREFETCH_AHEAD alumnos que siguen en la lista"""
+        if self.prefetch_task is not None and not self.prefetch_task.done():
+            self.prefetch_task.cancel()
+        student_id = student.get('doc_id', '')
+        index = next((i for i, s in enumerate(self.listed_students) if s.get('doc_id') == student_id), None)
+        upcoming = self.listed_students[index + 1:index + 1 + PREFETCH_AHEAD] if index is not None else []
+        upcoming_ids = {s.get('doc_id', '') for s in upcoming}
+        self.prefetched_panels = {k: v for k, v in self.prefetched_panels.items() if k in upcoming_ids}
+        self.prefetch_task = asyncio.create_task(self.prefetch_students(upcoming)) if upcoming else None
+
+    async def prefetch_students(self, students):
+        """Construye paneles y series de gráfica, cediendo el event loop entre alumnos"""
+        cuatrimestre = self.selected_cuatrimestre
+        try:
+            for student in students:
+                await asyncio.sleep(0)
+                student_id = student.get('doc_id', '')
+                if student_id not in self.prefetched_panels:
+                    self.prefetched_panels[student_id] = (self.build_student_info(student), self.build_recommendations(student))
+                responses = self.get_period_responses(student_id, cuatrimestre)
+                if responses:
+                    series_cache.get(student_id, cuatrimestre, responses)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[PREFETCH ERROR] Error al preparar alumnos: {str(e)}")
+
+    def build_student_info(self, student):
         last_login = student.get('lastLogin', 'N/A')
         if isinstance(last_login, datetime):
             last_login = last_login.strftime("%d %b")
-        info = Column([
+        return Column([
             Text(f"Nombre: {student.get('name', 'N/A')}", size=16, color=TutorDarkMoodPalette.TEXT_MAIN),
             Text(f"Edad: {student.get('age', 'N/A')}", color=TutorDarkMoodPalette.TEXT_MAIN),
             Text(f"Carrera: {student.get('class', 'N/A')}", color=TutorDarkMoodPalette.TEXT_MAIN),
@@ -275,45 +426,25 @@ class FilterContent(Column):
             Text(f"Activo: {'Sí' if student.get('isActive', False) else 'No'}", color=TutorDarkMoodPalette.TEXT_MAIN),
             Text(f"Último acceso: {last_login}", color=TutorDarkMoodPalette.TEXT_MAIN),
         ], spacing=6, scroll="auto")
-        self.student_info_container.content = info
 
-    def update_recommendations(self, student):
+    def update_student_info(self, student):
+        self.student_info_container.content = self.build_student_info(student)
+
+    def build_recommendations(self, student):
         recs = self.cache.get_user_recommendations(student.get('doc_id', '')) if self.cache else {}
-        content = Column([
+        return Column([
             Text("Recomendaciones actuales", size=16, weight="bold"),
             Text(f"Ansiedad: {recs.get('BAI', 'N/A')}", color=TutorDarkMoodPalette.TEXT_MAIN),
             Text(f"Depresión: {recs.get('BDI', 'N/A')}", color=TutorDarkMoodPalette.TEXT_MAIN),
             Text(f"Estrés: {recs.get('PSS', 'N/A')}", color=TutorDarkMoodPalette.TEXT_MAIN)
         ], spacing=8, scroll="auto")
-        self.recommendations_container.content = content
 
-    def get_month_name(self, month, year):
-        month_names = {
-            1: "Ene", 2: "Feb", 3: "Mar", 4: "Abr", 5: "May", 6: "Jun",
-            7: "Jul", 8: "Ago", 9: "Sep", 10: "Oct", 11: "Nov", 12: "Dic"
-        }
-        return f"{month_names[month]} {year}"
-
-    def month_to_number(self, month_name):
-        month_map = {
-            "Ene": 1, "Feb": 2, "Mar": 3, "Abr": 4, "May": 5, "Jun": 6,
-            "Jul": 7, "Ago": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dic": 12
-        }
-        return month_map.get(month_name, 1)
-
-    def get_quarter(self, date: datetime):
-        month = date.month
-        year = date.year
-        if 1 <= month <= 4:
-            return f"Ene-Abr {year}"
-        elif 5 <= month <= 8:
-            return f"May-Ago {year}"
-        else:
-            return f"Sep-Dic {year}"
+    def update_recommendations(self, student):
+        self.recommendations_container.content = self.build_recommendations(student)
 
     async def generate_report(self, e):
+        group = self.group_dropdown.value
         try:
-            group = self.group_dropdown.value
             if not group:
                 self.show_snackbar("Selecciona un grupo", TutorDarkMoodPalette.ERROR_FEEDBACK)
                 return
@@ -322,192 +453,62 @@ class FilterContent(Column):
                 self.show_snackbar(f"No hay alumnos en el grupo {group}", TutorDarkMoodPalette.ERROR_FEEDBACK)
                 return
 
-            doc = Document()
-            # Cover page
-            doc.add_heading("Reporte de Evaluaciones Psicológicas", 0).alignment = WD_ALIGN_PARAGRAPH.CENTER
-            doc.add_paragraph(f"Grupo: {group}", style='Heading 2').alignment = WD_ALIGN_PARAGRAPH.CENTER
-            doc.add_paragraph(f"Fecha: {datetime.now().strftime('%d %b %Y %H:%M')}", style='Heading 3').alignment = WD_ALIGN_PARAGRAPH.CENTER
-            doc.add_paragraph("Generado por SERENIA Tutores", style='Normal').alignment = WD_ALIGN_PARAGRAPH.CENTER
-            doc.add_page_break()
-
-            for user in users:
-                user_id = user.get("doc_id", "")
-                user_name = user.get("name", "Sin nombre")
-                # Student section
-                doc.add_heading(f"Alumno: {user_name}", level=1)
-                doc.add_paragraph(f"Email: {user.get('email', 'Sin email')}")
-                doc.add_paragraph(f"Grupo: {user.get('group', 'Sin grupo')}")
-                doc.add_paragraph(f"Edad: {user.get('age', 'N/A')}")
-                doc.add_paragraph(f"Carrera: {user.get('class', 'N/A')}")
-                doc.add_paragraph(f"Género: {user.get('gender', 'N/A')}")
-                doc.add_paragraph(f"Activo: {'Sí' if user.get('isActive', False) else 'No'}")
-                last_login = user.get('lastLogin', 'N/A')
-                if isinstance(last_login, datetime):
-                    last_login = last_login.strftime("%d %b")
-                doc.add_paragraph(f"Último acceso: {last_login}")
-                
-                # Results table
-                responses = self.cache.get_user_responses(user_id) if self.cache else []
-                if responses:
-                    doc.add_heading("Resultados de Cuestionarios", level=2)
-                    table = doc.add_table(rows=1, cols=3)  # Reduced to 3 columns
-                    table.style = 'Table Grid'
-                    table.autofit = True
-                    hdr_cells = table.rows[0].cells
-                    headers = ['Fecha', 'Cuestionario', 'Nivel']
-                    for i, header in enumerate(headers):
-                        hdr_cells[i].text = header
-                        run = hdr_cells[i].paragraphs[0].runs[0]
-                        run.font.size = Pt(10)
-                        run.font.name = 'Arial'
-                        run.bold = True
-                    for response in responses:
-                        date = response.get("date")
-                        if isinstance(date, str):
-                            try:
-                                date = datetime.fromisoformat(date.replace("Z", "+00:00"))
-                            except ValueError:
-                                date_str = str(date)
-                            else:
-                                date_str = date.strftime('%d %b')
-                        else:
-                            date_str = date.strftime('%d %b') if isinstance(date, datetime) else str(date)
-                        row_cells = table.add_row().cells
-                        row_cells[0].text = date_str
-                        row_cells[1].text = response.get("questionnaire", "N/A")
-                        row_cells[2].text = str(response.get("level", "N/A"))
-                        for cell in row_cells:
-                            run = cell.paragraphs[0].runs[0]
-                            run.font.size = Pt(10)
-                            run.font.name = 'Arial'
-
-                # Chart
-                quarters = {}
-                for response in responses:
-                    if isinstance(response["date"], str):
-                        try:
-                            date = datetime.fromisoformat(response["date"].replace("Z", "+00:00"))
-                        except ValueError:
-                            continue
-                    else:
-                        date = response["date"]
-                    quarter = self.get_quarter(date)
-                    questionnaire = response.get("questionnaire", "").strip().upper()
-                    level = response.get("level", 0)
-                    if quarter not in quarters:
-                        quarters[quarter] = {"BAI": None, "BDI": None, "PSS": None}
-                    quarters[quarter][questionnaire] = level
-
-                quarter_list = sorted(quarters.keys())
-                if quarter_list:
-                    fig, ax = plt.subplots(figsize=(6, 4))
-                    bai_levels = [quarters[q]["BAI"] if quarters[q]["BAI"] is not None else None for q in quarter_list]
-                    bdi_levels = [quarters[q]["BDI"] if quarters[q]["BDI"] is not None else None for q in quarter_list]
-                    pss_levels = [quarters[q]["PSS"] if quarters[q]["PSS"] is not None else None for q in quarter_list]
-                    ax.plot(quarter_list, bai_levels, label="Ansiedad", color=TutorDarkMoodPalette.ALERT, marker='o', linestyle='-', linewidth=2)
-                    ax.plot(quarter_list, bdi_levels, label="Depresión", color=TutorDarkMoodPalette.TRUST, marker='o', linestyle='-', linewidth=2)
-                    ax.plot(quarter_list, pss_levels, label="Estrés", color=TutorDarkMoodPalette.URGENT, marker='o', linestyle='-', linewidth=2)
-                    ax.set_title(f"Niveles por Cuatrimestre - {user_name}", fontsize=12, fontweight='bold', pad=10)
-                    ax.set_xlabel("Cuatrimestre", fontsize=10)
-                    ax.set_ylabel("Nivel", fontsize=10)
-                    ax.set_ylim(0, 3)
-                    ax.set_yticks([0, 1, 2, 3])
-                    ax.set_yticklabels(['Bajo', 'Leve', 'Moderado', 'Alto'], fontsize=9)
-                    ax.legend(loc='upper left', fontsize=9)
-                    ax.grid(True, linestyle='--', alpha=0.7)
-                    plt.xticks(rotation=45, fontsize=9)
-                    plt.tight_layout()
-                    temp_image = f"temp_{user_id}.png"
-                    plt.savefig(temp_image, bbox_inches='tight', dpi=150)
-                    plt.close()
-                    doc.add_heading("Gráfico de Niveles", level=2)
-                    doc.add_picture(temp_image, width=Inches(5.5))
-                    if os.path.exists(temp_image):
-                        os.remove(temp_image)
-
-                # Recommendations
-                recommendations = self.cache.get_user_recommendations(user_id) if self.cache else {}
-                doc.add_heading("Recomendaciones", level=2)
-                rec_map = {"BAI": "Ansiedad", "BDI": "Depresión", "PSS": "Estrés"}
-                for questionnaire, text in recommendations.items():
-                    name = rec_map.get(questionnaire, questionnaire)
-                    doc.add_paragraph(f"{name}:", style='List Bullet')
-                    p = doc.add_paragraph(text if text != "N/A" else "No hay recomendación disponible")
-                    p.paragraph_format.left_indent = Inches(0.5)
-                    for run in p.runs:
-                        run.font.size = Pt(10)
-                        run.font.name = 'Arial'
-                if not responses:
-                    doc.add_paragraph("No hay datos de cuestionarios disponibles.")
-                doc.add_page_break()
-
-            # Save document to memory for download
-            output_stream = io.BytesIO()
-            doc.save(output_stream)
-            output_stream.seek(0)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"Reporte_{group}_{timestamp}.docx"
-            base64_content = base64.b64encode(output_stream.getvalue()).decode('utf-8')
-            data_url = f"data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,{base64_content}"
-
-            # Create a download link
-            download_button = TextButton(
-                content=Text(f"Descargar {filename}", color=TutorDarkMoodPalette.TEXT_ON_ACCENT),
-                url=data_url,
-                style=ButtonStyle(
-                    bgcolor=TutorDarkMoodPalette.TRUST,
-                    padding=padding.symmetric(vertical=10, horizontal=20),
-                    shape=RoundedRectangleBorder(radius=8)
-                )
-            )
-            self.page.overlay.append(download_button)
-            self.show_snackbar(f"Reporte listo para descargar: {filename}", TutorDarkMoodPalette.SUCCESS_FEEDBACK)
-            self.page.update()
-            logger.info(f"[REPORT] Reporte generado para grupo {group} como enlace de descarga")
+            self.report_button.disabled = True
+            self.report_progress.value = 0
+            self.report_progress.visible = True
+            request_update(self.page)
+            filename, content = await generate_group_report(self.cache, group, on_progress=self.on_report_progress)
+
+            # El reporte queda en el almacén temporal del servidor y se descarga por URL
+            url = await report_store.publish(filename, content)
+            self.show_download(url, filename)
+            self.show_snackbar(f"Reporte listo: {filename}. Usa \"Descargar reporte\"", TutorDarkMoodPalette.SUCCESS_FEEDBACK)
+            logger.info(f"[REPORT] Reporte generado para grupo {group} como descarga temporal")
 
         except Exception as ex:
             self.show_snackbar(f"Error al generar reporte: {str(ex)}", TutorDarkMoodPalette.ERROR_FEEDBACK)
             logger.error(f"[REPORT ERROR] Error al generar reporte para grupo {group}: {str(ex)}")
+        finally:
+            self.report_button.disabled = False
+            self.report_progress.visible = False
+            request_update(self.page)
+
+    def show_download(self, url, filename):
+        """Muestra el enlace de descarga y lo retira cuando el almacén borra el reporte"""
+        self.download_button.url = url
+        self.download_button.tooltip = f"Descargar {filename}"
+        self.download_button.visible = True
+
+        def expire():
+            # Solo si no se generó otro reporte mientras tanto
+            if self.download_button.url == url:
+                self.download_button.visible = False
+                self.download_button.url = None
+                request_update(self.page)
+        asyncio.get_running_loop().call_later(report_store.ttl, expire)
+
+    def on_report_progress(self, done, total):
+        self.report_progress.value = done / total if total else 1
+        request_update(self.page)
+
+    def get_period_responses(self, student_id, cuatrimestre):
+        """Respuestas del alumno en el periodo seleccionado ("Todo" = todas)"""
+        if cuatrimestre == f"Todo {self.year}":
+            return self.cache.get_user_responses(student_id)
+        start, end = cuatrimestre_range(cuatrimestre)
+        return self.cache.get_user_responses_in_range(student_id, start, end)
 
     async def create_chart(self, student_id, cuatrimestre):
         if not student_id or not self.cache:
             return Text("No hay datos disponibles", color=TutorDarkMoodPalette.TEXT_MAIN)
-        responses = self.cache.get_user_responses(student_id)
-        if not responses:
+        if not self.cache.get_user_responses(student_id):
             return Text("No hay respuestas registradas", color=TutorDarkMoodPalette.TEXT_MAIN)
-        filtered_responses = responses
-        if cuatrimestre != f"Todo {self.year}":
-            start_date, end_date = self.get_cuatrimestre_dates(cuatrimestre)
-            filtered_responses = [
-                r for r in responses
-                if self.is_response_in_date_range(r, start_date, end_date)
-            ]
-            if not filtered_responses:
-                return Text(f"No hay datos para el período {cuatrimestre}",
-                            color=TutorDarkMoodPalette.TEXT_MAIN)
-        questionnaire_data = {"BAI": {}, "BDI": {}, "PSS": {}}
-        month_year_data = {}
-        for r in filtered_responses:
-            date = r.get("date")
-            if isinstance(date, str):
-                try:
-                    date = datetime.fromisoformat(date.replace("Z", "+00:00"))
-                except ValueError:
-                    continue
-            q = r.get("questionnaire", "").strip().upper()
-            if q not in questionnaire_data:
-                continue
-            level = r.get("level", 0)
-            month_year = (date.year, date.month)
-            if month_year not in month_year_data:
-                month_year_data[month_year] = {}
-            if q not in month_year_data[month_year] or date > month_year_data[month_year].get(q, {}).get("date", datetime.min.replace(tzinfo=timezone.utc)):
-                month_year_data[month_year][q] = {"date": date, "level": level}
-        for (year, month), q_data in month_year_data.items():
-            month_str = self.get_month_name(month, year)
-            for q in questionnaire_data:
-                if q in q_data:
-                    questionnaire_data[q][month_str] = q_data[q]["level"]
+        filtered_responses = self.get_period_responses(student_id, cuatrimestre)
+        if not filtered_responses:
+            return Text(f"No hay datos para el período {cuatrimestre}",
+                        color=TutorDarkMoodPalette.TEXT_MAIN)
+        # La serie se calcula una vez por alumno y periodo
+        series = series_cache.get(student_id, cuatrimestre, filtered_responses)
         data_series = []
         chart_colors = {
             "BAI": TutorDarkMoodPalette.ALERT,
@@ -515,19 +516,17 @@ class FilterContent(Column):
             "PSS": TutorDarkMoodPalette.URGENT
         }
         level_labels = {0: "Bajo", 1: "Leve", 2: "Moderado", 3: "Alto"}
-        all_months = sorted(
-            set([m for data in questionnaire_data.values() for m in data.keys()]),
-            key=lambda m: (int(m.split()[1]), self.month_to_number(m.split()[0]))
-        )
-        for q_type in ["BAI", "BDI", "PSS"]:
+        all_months = series["months"]
+        for q_type in QUESTIONNAIRE_ORDER:
+            q_levels = series["levels"][q_type]
             points = [
                 LineChartDataPoint(
                     x=i+1,
-                    y=questionnaire_data[q_type][month],
-                    tooltip=f"{q_type}: {level_labels.get(questionnaire_data[q_type][month], 'N/A')} ({questionnaire_data[q_type][month]})"
+                    y=q_levels[month],
+                    tooltip=f"{q_type}: {level_labels.get(q_levels[month], 'N/A')} ({q_levels[month]})"
                 )
                 for i, month in enumerate(all_months)
-                if month in questionnaire_data[q_type]
+                if month in q_levels
             ]
             if points:
                 data_series.append(
@@ -555,9 +554,9 @@ class FilterContent(Column):
                 labels=[
                     ChartAxisLabel(
                         value=i+1,
-                        label=Text(month.split()[0], size=10, color=TutorDarkMoodPalette.TEXT_MAIN)
+                        label=Text(MONTH_NAMES[month], size=10, color=TutorDarkMoodPalette.TEXT_MAIN)
                     )
-                    for i, month in enumerate(all_months)
+                    for i, (_, month) in enumerate(all_months)
                 ],
                 labels_size=40
             ),
@@ -575,91 +574,81 @@ class FilterContent(Column):
             expand=True,
             tooltip_bgcolor=TutorDarkMoodPalette.CARD_SURFACE,
         )
-        tables = []
-        table_map = [
-            ("Ansiedad", "BAI"),
-            ("Depresión", "BDI"),
-            ("Estrés", "PSS")
-        ]
-        for title, q in table_map:
-            q_responses = sorted(
-                [r for r in filtered_responses if r.get("questionnaire", "").strip().upper() == q],
-                key=lambda r: r.get("date", datetime.min),
-                reverse=True
-            )
-            table_rows = [
-                DataRow(cells=[
-                    DataCell(Text("Fecha", weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN)),
-                    DataCell(Text("Nivel", weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN))
-                ])
-            ]
-            if q_responses:
-                for r in q_responses:
-                    date = r.get("date")
-                    if isinstance(date, str):
-                        date = datetime.fromisoformat(date.replace("Z", "+00:00"))
-                    date_str = date.strftime("%d %b")
-                    level = r.get("level", "N/A")
-                    table_rows.append(DataRow(cells=[
-                        DataCell(Text(date_str, weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN)),
-                        DataCell(Text(str(level), weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN))
-                    ]))
-            else:
-                table_rows.append(DataRow(cells=[
-                    DataCell(Text("No hay datos", color=TutorDarkMoodPalette.TEXT_MAIN)),
-                    DataCell(Text(""))
-                ]))
-            table = DataTable(
-                columns=[
-                    DataColumn(label=Row([
-                        Container(
-                            width=10,
-                            height=10,
-                            bgcolor=chart_colors[q]
-                        ),
-                        Text(title, weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN)
-                    ], spacing=4, vertical_alignment=CrossAxisAlignment.CENTER)),
-                    DataColumn(label=Text("")),
-                ],
-                rows=table_rows,
-                border=border.all(1, TutorDarkMoodPalette.BORDER_SUBTLE),
-                border_radius=8,
-                expand=True
-            )
-            tables.append(
-                Container(
-                    content=Column([table], scroll="auto"),
-                    height=200,
-                    expand=True
-                )
-            )
-        content = Column([
-            chart,
-            Text("Registros detallados", size=16, weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN),
-            Row(tables, spacing=10, expand=True)
-        ], spacing=10, scroll="auto")
+        # Las tablas de registros se construyen solo al desplegar la sección
+        details = ExpansionTile(
+            title=Text("Registros detallados", size=16, weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN),
+            initially_expanded=False,
+            controls=[]
+        )
+        details.on_change = lambda e: self.on_details_toggle(e, details, series["history"], chart_colors)
+        content = Column([chart, details], spacing=10, scroll="auto")
         return content
 
-    def get_cuatrimestre_dates(self, cuatrimestre):
-        year = self.year
-        if cuatrimestre == f"Ene-Abr {year}":
-            return datetime(year, 1, 1, tzinfo=timezone.utc), datetime(year, 4, 30, tzinfo=timezone.utc)
-        elif cuatrimestre == f"May-Ago {year}":
-            return datetime(year, 5, 1, tzinfo=timezone.utc), datetime(year, 8, 31, tzinfo=timezone.utc)
-        elif cuatrimestre == f"Sep-Dic {year}":
-            return datetime(year, 9, 1, tzinfo=timezone.utc), datetime(year, 12, 31, tzinfo=timezone.utc)
-        return None, None
-
-    def is_response_in_date_range(self, response, start_date, end_date):
-        date = response.get("date")
-        if not date:
-            return False
-        if isinstance(date, str):
-            try:
-                date = datetime.fromisoformat(date.replace("Z", "+00:00"))
-            except ValueError:
-                return False
-        return start_date <= date <= end_date
+    def on_details_toggle(self, e, details, history, chart_colors):
+        if details.controls or str(e.data).lower() != "true":
+            return
+        details.controls = [Row(
+            [self.create_detail_table(title, q, history[q], chart_colors[q])
+             for title, q in (("Ansiedad", "BAI"), ("Depresión", "BDI"), ("Estrés", "PSS"))],
+            spacing=10, expand=True
+        )]
+        if self.page:
+            request_update(self.page)
+
+    def create_detail_row(self, r):
+        date_str = r.date.strftime("%d %b") if r.date else "N/A"
+        return DataRow(cells=[
+            DataCell(Text(date_str, weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN)),
+            DataCell(Text(str(r.get("level", "N/A")), weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN))
+        ])
+
+    def create_detail_table(self, title, q, q_responses, color):
+        """Tabla de un cuestionario (respuestas más recientes primero) paginada de DETAIL_PAGE_SIZE filas"""
+        table_rows = [
+            DataRow(cells=[
+                DataCell(Text("Fecha", weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN)),
+                DataCell(Text("Nivel", weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN))
+            ])
+        ]
+        if q_responses:
+            table_rows.extend(self.create_detail_row(r) for r in q_responses[:DETAIL_PAGE_SIZE])
+        else:
+            table_rows.append(DataRow(cells=[
+                DataCell(Text("No hay datos", color=TutorDarkMoodPalette.TEXT_MAIN)),
+                DataCell(Text(""))
+            ]))
+        table = DataTable(
+            columns=[
+                DataColumn(label=Row([
+                    Container(
+                        width=10,
+                        height=10,
+                        bgcolor=color
+                    ),
+                    Text(title, weight="bold", color=TutorDarkMoodPalette.TEXT_MAIN)
+                ], spacing=4, vertical_alignment=CrossAxisAlignment.CENTER)),
+                DataColumn(label=Text("")),
+            ],
+            rows=table_rows,
+            border=border.all(1, TutorDarkMoodPalette.BORDER_SUBTLE),
+            border_radius=8,
+            expand=True
+        )
+        column = Column([table], scroll="auto")
+        if len(q_responses) > DETAIL_PAGE_SIZE:
+            more_button = TextButton("Ver más")
+
+            def show_more(e):
+                shown = len(table.rows) - 1
+                table.rows.extend(self.create_detail_row(r) for r in q_responses[shown:shown + DETAIL_PAGE_SIZE])
+                if len(table.rows) - 1 >= len(q_responses):
+                    column.controls.remove(more_button)
+                if self.page:
+                    request_update(self.page)
+
+            more_button.on_click = show_more
+            column.controls.append(more_button)
+        return Container(content=column, height=200, expand=True)
 
     async def on_cuatrimestre_change(self, e):
         self.selected_cuatrimestre = e.control.value
@@ -669,4 +658,4 @@ class FilterContent(Column):
                 self.selected_cuatrimestre
             )
             if self.page:
-                self.page.update()
\ No newline at end of file
+                request_update(self.page)
\ No newline at end of file
@@ -4,6 +4,7 @@ from flet import (
     BoxShadow, Offset, ShadowBlurStyle, DataTable, DataColumn, DataRow, DataCell, AlertDialog, ButtonStyle, Icons, SnackBar
 )
 from services.data_cache import DataCache
+from screens.render_scheduler import request_update
 import asyncio
 import time
 import logging
@@ -283,7 +284,7 @@ class ProfileContent(Column):
             show_close_icon=True
         )
         self.page.snack_bar.open = True
-        self.page.update()
+        request_update(self.page)
 
     async def initialize(self):
         if self.initializing:
@@ -306,7 +307,7 @@ class ProfileContent(Column):
             self.show_snackbar(f"Error al cargar grupos: {str(e)}", TutorDarkMoodPalette.ERROR_FEEDBACK)
         finally:
             self.initializing = False
-            self.page.update()
+            request_update(self.page)
 
     def create_group_row(self, group):
         return DataRow(
@@ -388,7 +389,7 @@ class ProfileContent(Column):
             self.show_snackbar(f"Error al agregar grupo: {str(e)}", TutorDarkMoodPalette.ERROR_FEEDBACK)
         finally:
             self.is_updating = False
-            self.page.update()
+            request_update(self.page)
 
     def on_edit_group(self, e, group):
         self.edit_dialog.content.value = group
@@ -397,7 +398,7 @@ class ProfileContent(Column):
             self.page.overlay.append(self.edit_dialog)
         self.page.dialog = self.edit_dialog
         self.edit_dialog.open = True
-        self.page.update()
+        request_update(self.page)
 
     async def on_save_edit(self, e):
         current_time = time.time()
@@ -432,7 +433,7 @@ class ProfileContent(Column):
             self.show_snackbar(f"Error al actualizar grupo: {str(e)}", TutorDarkMoodPalette.ERROR_FEEDBACK)
         finally:
             self.is_updating = False
-            self.page.update()
+            request_update(self.page)
 
     def on_delete_group(self, e, group):
         self.delete_dialog.content.value = f"¿Estás seguro de eliminar el grupo {group}?"
@@ -441,7 +442,7 @@ class ProfileContent(Column):
             self.page.overlay.append(self.delete_dialog)
         self.page.dialog = self.delete_dialog
         self.delete_dialog.open = True
-        self.page.update()
+        request_update(self.page)
 
     async def on_confirm_delete(self, e):
         current_time = time.time()
@@ -466,10 +467,10 @@ class ProfileContent(Column):
             self.show_snackbar(f"Error al eliminar grupo: {str(e)}", TutorDarkMoodPalette.ERROR_FEEDBACK)
         finally:
             self.is_updating = False
-            self.page.update()
+            request_update(self.page)
 
     def close_dialog(self, e=None):
         self.page.dialog = None
         self.edit_dialog.open = False
         self.delete_dialog.open = False
-        self.page.update()
\ No newline at end of file
+        request_update(self.page)
\ No newline at end of file
@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _Scope:
+    """Interacción abierta en una tarea; las tareas hijas heredan la referencia pero no la retienen al cerrarse"""
+    __slots__ = ("scheduler", "open")
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.open = True
+
+
+# Scope de la tarea actual: retener flushes afecta solo a la interacción que lo abrió
+_current_scope: contextvars.ContextVar = contextvars.ContextVar("render_scope", default=None)
+
+
+class RenderScheduler:
+    """
+    Agrupa las llamadas a page.update() de una página. Las solicitudes hechas en
+    la misma vuelta del event loop se envían en un solo flush; dentro de un
+    interaction_scope se envían una sola vez al cerrar el scope. Lleva la cuenta
+    de solicitudes y flushes, en total y por interacción.
+
+    El scope es por tarea: mientras una interacción lo tiene abierto, las
+    solicitudes de otras tareas (progreso de reportes, snackbars) se siguen
+    enviando en la siguiente vuelta del loop.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.requests = 0
+        self.flushes = 0
+        self._pending = False
+        self._scheduled = False
+
+    def request_update(self):
+        """Pide un page.update(); se ejecuta en la próxima vuelta del event loop"""
+        self.requests += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            # Handlers síncronos que Flet ejecuta en hilos: no hay loop que agrupe
+            self._flush()
+            return
+        self._pending = True
+        if self._scheduled or self._in_scope():
+            return
+        self._scheduled = True
+        loop.call_soon(self._flush_scheduled)
+
+    def _in_scope(self) -> bool:
+        scope = _current_scope.get()
+        return scope is not None and scope.open and scope.scheduler is self
+
+    def _flush_scheduled(self):
+        self._scheduled = False
+        self.flush()
+
+    def flush(self):
+        """Envía ahora los cambios pendientes, si los hay"""
+        if not self._pending:
+            return
+        self._pending = False
+        self._flush()
+
+    def _flush(self):
+        self.flushes += 1
+        self.page.update()
+
+    @asynccontextmanager
+    async def interaction_scope(self, name: str):
+        """Retiene los flushes de esta tarea hasta el final de la interacción y registra cuántos hubo"""
+        if self._in_scope():
+            # Scope anidado: el externo hace el flush
+            yield self
+            return
+        requests, flushes = self.requests, self.flushes
+        scope = _Scope(self)
+        token = _current_scope.set(scope)
+        try:
+            yield self
+        finally:
+            scope.open = False
+            _current_scope.reset(token)
+            self.flush()
+            logger.debug(
+                f"[RENDER] {name}: {self.requests - requests} solicitudes, {self.flushes - flushes} flushes"
+            )
+
+
+_schedulers = weakref.WeakKeyDictionary()
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(page) -> RenderScheduler:
+    """Devuelve el planificador de renderizado de una página (uno por sesión)"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(page)
+        if scheduler is None:
+            scheduler = RenderScheduler(page)
+            _schedulers[page] = scheduler
+        return scheduler
+
+
+def request_update(page):
+    """Reemplazo de page.update() que agrupa las actualizaciones de la página"""
+    if page:
+        get_scheduler(page).request_update()
+
+
+@asynccontextmanager
+async def interaction_scope(page, name: str):
+    """Agrupa en un solo flush las actualizaciones de una interacción sobre la página"""
+    if not page:
+        yield None
+        return
+    async with get_scheduler(page).interaction_scope(name) as scheduler:
+        yield scheduler
@@ -1,14 +1,19 @@
 from flet import *
+from collections import OrderedDict
 import logging
 from screens.dashboard_content import DashboardContent
 from screens.filter_content import FilterContent
 from screens.profile_content import ProfileContent
 from services.data_cache import DataCache
+from screens.render_scheduler import interaction_scope, request_update
 
 # Suppress Flet and Matplotlib logs
 logging.getLogger('flet').setLevel(logging.WARNING)
 logging.getLogger('matplotlib').setLevel(logging.WARNING)
 
+# Vistas construidas (página, grupo) que se mantienen vivas en el template
+VIEW_CACHE_SIZE = 8
+
 class TutorDarkMoodPalette:
     MAIN_BACKGROUND = "#1E252D"
     CARD_SURFACE = "#2A323C"
@@ -159,7 +164,7 @@ class Sidebar(Container):
 
     async def on_refresh_cache(self, e):
         try:
-            await self.cache.load_all_data()
+            await self.cache.reload()
             self.show_snackbar("Caché actualizado exitosamente", TutorDarkMoodPalette.SUCCESS_FEEDBACK)
         except Exception as ex:
             self.show_snackbar(f"Error al actualizar caché: {str(ex)}", TutorDarkMoodPalette.ERROR_FEEDBACK)
@@ -179,7 +184,7 @@ class Sidebar(Container):
             show_close_icon=True
         )
         self.page.snack_bar.open = True
-        self.page.update()
+        request_update(self.page)
 
 class DashboardTemplate(Container):
     def __init__(self, page, tutor_data, on_group_select, cache: DataCache):
@@ -191,6 +196,10 @@ class DashboardTemplate(Container):
         self.current_page = "Dashboard"
         self.selected_group = tutor_data.get("groups", [])[0] if tutor_data.get("groups") else None
         self.initializing = False
+        # Caché de vistas: (página, grupo) -> control ya construido, y la marca de
+        # datos (cache.last_update y grupos del tutor) con la que se refrescó
+        self.views = OrderedDict()
+        self.view_stamps = {}
         self.content_container = Container(
             content=Column(
                 controls=[
@@ -234,123 +243,172 @@ class DashboardTemplate(Container):
             dashboard_content = self.content_container.content.controls[0]
             if isinstance(dashboard_content, DashboardContent):
                 await dashboard_content.initialize()
+                self.store_view("Dashboard", self.selected_group, dashboard_content)
         if self.page:
-            self.page.update()
+            request_update(self.page)
 
-    async def on_group_select_wrapper(self, selected_group, tutor_data=None):
-        if self.initializing:
-            return
-        self.initializing = True
-        try:
-            self.selected_group = selected_group
-            if tutor_data:
-                self.tutor_data = tutor_data
-            if self.current_page == "Filtrado":
-                if isinstance(self.content_container.content, Column):
-                    current_content = self.content_container.content.controls[0]
-                    if isinstance(current_content, FilterContent):
-                        await current_content.update_group(selected_group)
-                    else:
-                        new_content = FilterContent(
-                            self.page,
-                            self.tutor_data,
-                            selected_group=selected_group,
-                            on_group_change=self.on_group_select_wrapper,
-                            cache=self.cache
-                        )
-                        await new_content.initialize()
-                        self.content_container.content.controls = [new_content]
-            elif self.current_page == "Dashboard":
-                new_content = DashboardContent(
-                    self.page,
-                    self.tutor_data,
-                    selected_group=selected_group,
-                    on_group_change=self.on_group_select_wrapper,
-                    cache=self.cache
-                )
-                await new_content.initialize()
-                self.content_container.content.controls = [new_content]
-            elif self.current_page == "Config":
-                if isinstance(self.content_container.content, Column) and isinstance(self.content_container.content.controls[0], ProfileContent):
-                    current_content = self.content_container.content.controls[0]
-                    current_content.groups = self.tutor_data.get('groups', [])
-                    current_content.groups_table.rows = [current_content.create_group_row(group) for group in current_content.groups]
-                    current_content.selected_group = selected_group
-                    await current_content.initialize()
-                else:
-                    new_content = ProfileContent(
-                        self.page,
-                        self.tutor_data,
-                        on_group_change=self.on_group_select_wrapper,
-                        cache=self.cache
-                    )
-                    await new_content.initialize()
-                    self.content_container.content.controls = [new_content]
-            if self.page:
-                self.page.update()
-            if self.on_group_select:
-                await self.on_group_select(selected_group)
-        finally:
-            self.initializing = False
+    def view_key(self, page_label, group):
+        # La configuración no depende del grupo seleccionado
+        return (page_label, None if page_label == "Config" else group)
 
-    async def on_page_change(self, page_label):
-        self.current_page = page_label
+    def data_stamp(self):
+        return self.cache.last_update, tuple(self.tutor_data.get("groups", []))
+
+    def store_view(self, page_label, group, view):
+        key = self.view_key(page_label, group)
+        self.views[key] = view
+        self.views.move_to_end(key)
+        self.view_stamps[key] = self.data_stamp()
+        while len(self.views) > VIEW_CACHE_SIZE:
+            old_key, _ = self.views.popitem(last=False)
+            self.view_stamps.pop(old_key, None)
+
+    def build_view(self, page_label, group):
         if page_label == "Dashboard":
-            new_content = DashboardContent(
-                self.page,
-                self.tutor_data,
-                selected_group=self.selected_group,
-                on_group_change=self.on_group_select_wrapper,
-                cache=self.cache
-            )
-            await new_content.initialize()
-        elif page_label == "Filtrado":
-            new_content = FilterContent(
+            return DashboardContent(
                 self.page,
                 self.tutor_data,
-                selected_group=self.selected_group,
+                selected_group=group,
                 on_group_change=self.on_group_select_wrapper,
                 cache=self.cache
             )
-            await new_content.initialize()
-        elif page_label == "Config":
-            new_content = ProfileContent(
+        if page_label == "Filtrado":
+            return FilterContent(
                 self.page,
                 self.tutor_data,
+                selected_group=group,
                 on_group_change=self.on_group_select_wrapper,
                 cache=self.cache
             )
-            await new_content.initialize()
+        return ProfileContent(
+            self.page,
+            self.tutor_data,
+            on_group_change=self.on_group_select_wrapper,
+            cache=self.cache
+        )
+
+    async def refresh_view(self, page_label, group, view):
+        """Actualiza solo los datos de una vista ya construida"""
+        groups = self.tutor_data.get("groups", [])
+        if page_label == "Dashboard":
+            view.groups = groups
+            view.group_dropdown.options = [dropdown.Option(g) for g in groups]
+            view.selected_group = group
+            view.group_dropdown.value = group
+            await view.update_metrics_and_chart()
+        elif page_label == "Filtrado":
+            view.group_dropdown.options = [dropdown.Option(g) for g in groups]
+            if view.selected_group != group:
+                view.group_dropdown.value = group
+                await view.update_group(group)
+            else:
+                await view.refresh_data()
         else:
-            new_content = Column(
-                controls=[
-                    Text(
-                        "Página " + page_label + " en construcción",
-                        color=TutorDarkMoodPalette.TEXT_MAIN,
-                        size=24,
-                        weight='w700',
-                        font_family="Fredoka",
-                        text_align="center"
-                    ),
-                    Text(
-                        "¡Pronto estará disponible!",
-                        color=TutorDarkMoodPalette.TEXT_SUBTLE,
-                        size=16,
-                        font_family="Fredoka",
-                        text_align="center"
-                    )
-                ],
-                alignment=MainAxisAlignment.CENTER,
-                horizontal_alignment=CrossAxisAlignment.CENTER,
-                expand=True,
-                width=1012
-            )
-        await self.update_content(new_content)
+            # initialize() avisa del grupo seleccionado, que el template ya conoce
+            on_group_change, view.on_group_change = view.on_group_change, None
+            try:
+                await view.initialize()
+            finally:
+                view.on_group_change = on_group_change
+
+    async def get_view(self, page_label, group):
+        """
+        Devuelve la vista de la página y el grupo, reutilizando la ya construida.
+        Solo se refrescan sus datos si el caché cambió desde la última vez o si la
+        vista quedó mostrando otro grupo.
+        """
+        key = self.view_key(page_label, group)
+        view = self.views.get(key)
+        if view is None:
+            view = self.build_view(page_label, group)
+            # Se registra antes de inicializar para que los avisos de grupo que
+            # emita initialize() la encuentren en lugar de construir otra
+            self.store_view(page_label, group, view)
+            await view.initialize()
+            print(f"[DASHBOARD] Vista {key} construida")
+        else:
+            stale_group = page_label != "Config" and getattr(view, "selected_group", group) != group
+            if stale_group or self.view_stamps.get(key) != self.data_stamp():
+                await self.refresh_view(page_label, group, view)
+        self.store_view(page_label, group, view)
+        return view
+
+    async def on_group_select_wrapper(self, selected_group, tutor_data=None):
+        if self.initializing:
+            return
+        async with interaction_scope(self.page, "cambio de grupo"):
+            self.initializing = True
+            try:
+                previous_group = self.selected_group
+                self.selected_group = selected_group
+                if tutor_data:
+                    self.tutor_data = tutor_data
+                current_content = self.content_container.content.controls[0] if isinstance(self.content_container.content, Column) else None
+                if self.current_page in ("Dashboard", "Filtrado"):
+                    if isinstance(current_content, (DashboardContent, FilterContent)) and current_content.selected_group == selected_group:
+                        # La vista ya cambió de grupo por sí misma: solo se reubica en el caché
+                        old_key = self.view_key(self.current_page, previous_group)
+                        if self.views.get(old_key) is current_content:
+                            del self.views[old_key]
+                            self.view_stamps.pop(old_key, None)
+                        self.store_view(self.current_page, selected_group, current_content)
+                    else:
+                        new_content = await self.get_view(self.current_page, selected_group)
+                        self.content_container.content.controls = [new_content]
+                elif self.current_page == "Config":
+                    if isinstance(current_content, ProfileContent):
+                        current_content.groups = self.tutor_data.get('groups', [])
+                        current_content.groups_table.rows = [current_content.create_group_row(group) for group in current_content.groups]
+                        current_content.selected_group = selected_group
+                        await current_content.initialize()
+                        self.store_view("Config", None, current_content)
+                    else:
+                        new_content = await self.get_view("Config", None)
+                        self.content_container.content.controls = [new_content]
+                if self.page:
+                    request_update(self.page)
+                if self.on_group_select:
+                    await self.on_group_select(selected_group)
+            finally:
+                self.initializing = False
+
+    async def on_page_change(self, page_label):
+        # La política de frescura puede ir a la red: se resuelve antes de abrir el scope
+        await self.cache.ensure_fresh()
+        async with interaction_scope(self.page, f"pagina {page_label}"):
+            self.current_page = page_label
+            if page_label in ("Dashboard", "Filtrado", "Config"):
+                new_content = await self.get_view(page_label, self.selected_group)
+            else:
+                new_content = Column(
+                    controls=[
+                        Text(
+                            "Página " + page_label + " en construcción",
+                            color=TutorDarkMoodPalette.TEXT_MAIN,
+                            size=24,
+                            weight='w700',
+                            font_family="Fredoka",
+                            text_align="center"
+                        ),
+                        Text(
+                            "¡Pronto estará disponible!",
+                            color=TutorDarkMoodPalette.TEXT_SUBTLE,
+                            size=16,
+                            font_family="Fredoka",
+                            text_align="center"
+                        )
+                    ],
+                    alignment=MainAxisAlignment.CENTER,
+                    horizontal_alignment=CrossAxisAlignment.CENTER,
+                    expand=True,
+                    width=1012
+                )
+            await self.update_content(new_content)
 
     async def update_content(self, new_content):
         self.content_container.content.controls = [new_content]
         if self.page:
-            self.page.update()
+            request_update(self.page)
 
 async def show_dashboard_template(page: Page, tutor_data, on_group_select, cache: DataCache):
     if not tutor_data or not isinstance(tutor_data, dict):
@@ -371,7 +429,7 @@ async def show_dashboard_template(page: Page, tutor_data, on_group_select, cache
                 horizontal_alignment=CrossAxisAlignment.CENTER
             )
         )
-        page.update()
+        request_update(page)
         return None
     page.title = "Dashboard | SERENIA"
     page.horizontal_alignment = 'center'
@@ -398,5 +456,5 @@ async def show_dashboard_template(page: Page, tutor_data, on_group_select, cache
     dashboard_template = DashboardTemplate(page, tutor_data, on_group_select, cache)
     page.add(dashboard_template)
     await dashboard_template.initialize_content()
-    page.update()
+    request_update(page)
     return dashboard_template
@@ -0,0 +1,101 @@
+from flet import Page, Text
+import asyncio
+import logging
+import os
+from screens.login_screen import show_login
+from screens.register_screen import show_register
+from screens.sidebar import show_dashboard_template
+from screens.filter_content import FilterContent
+from services.data_cache import DataCache
+from screens.render_scheduler import interaction_scope, request_update
+
+# Configurar logging para minimizar mensajes en consola
+logging.basicConfig(level=logging.WARNING)
+logging.getLogger('flet').setLevel(logging.WARNING)
+logging.getLogger('matplotlib').setLevel(logging.WARNING)
+logging.getLogger().setLevel(logging.WARNING)  # Nivel global
+
+# Modo en vivo opcional: SERENIA_LIVE_UPDATES=1 activa los listeners de Firestore
+LIVE_UPDATES = os.getenv("SERENIA_LIVE_UPDATES", "0") == "1"
+
+# Aplicación SerenIA; el punto de entrada es main.py
+async def main(page: Page):
+    page.title = "SERENIA"
+    page.horizontal_alignment = 'center'
+    page.vertical_alignment = 'center'
+    page.bgcolor = "#1E252D"  # Usar color de fondo consistente con el tema
+    page.fonts = {
+        "Fredoka": "https://fonts.googleapis.com/css2?family=Fredoka:wght@300;400;500;600;700&display=swap"
+    }
+
+    # Inicializar caché (desde el snapshot local en el primer arranque)
+    cache = DataCache()
+    await cache.restore_snapshot()
+    logged_in = False
+    tutor_data = None
+    dashboard_template = None
+    selected_group = None
+    group_change_in_progress = False
+
+    async def on_group_select(group):
+        nonlocal dashboard_template, tutor_data, selected_group, group_change_in_progress
+        if group_change_in_progress:
+            return
+        group_change_in_progress = True
+        async with interaction_scope(page, "seleccion de grupo"):
+            try:
+                selected_group = group
+                if dashboard_template and tutor_data:
+                    await dashboard_template.on_group_select_wrapper(group)
+                request_update(page)
+            except Exception as e:
+                page.controls.clear()
+                page.add(
+                    Text(
+                        f"Error al seleccionar grupo: {str(e)}",
+                        color="#F87171",
+                        size=20,
+                        font_family="Fredoka"
+                    )
+                )
+                request_update(page)
+            finally:
+                group_change_in_progress = False
+
+    async def navigate(route, data=None):
+        nonlocal logged_in, tutor_data, dashboard_template, selected_group
+        page.controls.clear()
+        if route == "login":
+            await show_login(page, navigate, cache)
+        elif route == "register":
+            await show_register(page, navigate, cache)
+        elif route == "dashboard":
+            if not data or not isinstance(data, dict):
+                await navigate("login")
+                return
+            logged_in = True
+            tutor_data = data
+            selected_group = tutor_data.get("groups", [None])[0]
+            if LIVE_UPDATES:
+                cache.start_live_updates(asyncio.get_running_loop())
+            try:
+                dashboard_template = await show_dashboard_template(page, tutor_data, on_group_select, cache)
+            except Exception as e:
+                page.controls.clear()
+                page.add(
+                    Text(
+                        f"Error al cargar el dashboard: {str(e)}",
+                        color="#F87171",
+                        size=20,
+                        font_family="Fredoka"
+                    )
+                )
+                request_update(page)
+                return
+        elif route == "filter":
+            page.add(FilterContent(page, tutor_data, selected_group, on_group_select, cache))
+        else:
+            page.add(Text("Página no encontrada", color="#F87171", size=20, font_family="Fredoka"))
+        request_update(page)
+
+    await navigate("login")
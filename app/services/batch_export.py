@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+import zipfile
+from datetime import datetime
+from typing import Callable, List, Optional
+from google.cloud.firestore_v1.base_query import FieldFilter
+from services.firebase_service import db
+from services.data_cache import DataCache
+from services.report_service import generate_group_report, notify_progress, shutdown_chart_executor
+from services.report_store import safe_filename
+from services.cli import configure_cli_logging
+
+logger = logging.getLogger(__name__)
+
+# Reportes de grupo que se generan a la vez en una exportación por lotes
+BATCH_CONCURRENCY = int(os.getenv("SERENIA_BATCH_CONCURRENCY", "2"))
+
+
+async def resolve_tutor_groups(cache: DataCache, email: str) -> List[str]:
+    """Carga en caché el alcance de un tutor a partir de su email y devuelve sus grupos"""
+    query = db.collection("tutors").where(filter=FieldFilter("email", "==", email))
+    docs = await asyncio.to_thread(query.get)
+    if not docs:
+        raise ValueError(f"No existe tutor con email: {email}")
+    await cache.load_tutor_scope(docs[0])
+    return cache.get_tutor(docs[0].id).get("groups", [])
+
+
+def _write_file(path: str, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+async def export_reports(
+    cache: DataCache,
+    groups: List[str],
+    period: Optional[str] = None,
+    output_dir: str = "reportes",
+    as_zip: bool = False,
+    concurrency: int = BATCH_CONCURRENCY,
+    on_progress: Optional[Callable] = None
+) -> dict:
+    """
+    Genera los reportes de varios grupos con paralelismo acotado y los guarda en
+    output_dir, como archivos sueltos o en un único .zip. Un grupo que falla no
+    detiene al resto. on_progress(hechos, total, grupo, segundos) se llama al
+    terminar cada grupo.
+
+    Returns:
+        dict: archivos generados, errores por grupo, tiempos por grupo y ruta de salida
+    """
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    await cache.load_groups(groups)
+
+    zip_path = None
+    archive = None
+    if as_zip:
+        period_tag = f"_{period.replace(' ', '_')}" if period else ""
+        zip_path = os.path.join(output_dir, safe_filename(f"Reportes{period_tag}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"))
+        archive = zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED)
+    write_lock = asyncio.Lock()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    result = {"files": [], "errors": {}, "timings": {}, "output": zip_path or output_dir}
+    done = 0
+
+    async def export_group(group: str):
+        nonlocal done
+        async with semaphore:
+            group_started = time.perf_counter()
+            try:
+                filename, content = await generate_group_report(cache, group, period=period)
+                async with write_lock:
+                    if archive is not None:
+                        await asyncio.to_thread(archive.writestr, filename, content)
+                    else:
+                        await asyncio.to_thread(_write_file, os.path.join(output_dir, safe_filename(filename)), content)
+                result["files"].append(filename)
+            except Exception as e:
+                result["errors"][group] = str(e)
+                logger.error(f"[BATCH ERROR] Error al exportar grupo {group}: {str(e)}")
+            elapsed = time.perf_counter() - group_started
+            result["timings"][group] = elapsed
+            done += 1
+            await notify_progress(on_progress, done, len(groups), group, elapsed)
+
+    try:
+        await asyncio.gather(*(export_group(group) for group in groups))
+    finally:
+        if archive is not None:
+            await asyncio.to_thread(archive.close)
+    result["elapsed"] = time.perf_counter() - started
+    logger.info(
+        f"[BATCH] {len(result['files'])}/{len(groups)} reportes exportados en {result['elapsed']:.1f} s a {result['output']}"
+    )
+    return result
+
+
+async def _run_cli(args) -> int:
+    cache = DataCache()
+    groups = list(args.groups or [])
+    if args.tutor:
+        groups.extend(g for g in await resolve_tutor_groups(cache, args.tutor) if g not in groups)
+    if not groups:
+        print("[BATCH] No hay grupos que exportar")
+        return 1
+
+    def on_progress(done, total, group, seconds):
+        print(f"[BATCH] {done}/{total} grupo {group} listo en {seconds:.1f} s")
+
+    try:
+        result = await export_reports(
+            cache, groups, period=args.period, output_dir=args.output,
+            as_zip=args.zip, concurrency=args.concurrency, on_progress=on_progress
+        )
+    finally:
+        shutdown_chart_executor()
+    for group, error in result["errors"].items():
+        print(f"[BATCH ERROR] {group}: {error}")
+    print(f"[BATCH] {len(result['files'])} reportes en {result['output']} ({result['elapsed']:.1f} s)")
+    return 1 if result["errors"] else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Exportación por lotes sin interfaz; se ejecuta desde export_reports.py (ver ese módulo)"""
+    parser = argparse.ArgumentParser(description="Exporta los reportes de varios grupos de SERENIA")
+    parser.add_argument("--tutor", help="email del tutor cuyos grupos se exportan")
+    parser.add_argument("--groups", nargs="+", help="grupos a exportar")
+    parser.add_argument("--period", help='cuatrimestre a incluir, p. ej. "Ene-Abr 2025" (por defecto todo)')
+    parser.add_argument("--output", default="reportes", help="carpeta de salida")
+    parser.add_argument("--zip", action="store_true", help="guardar todos los reportes en un .zip")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="grupos en paralelo")
+    args = parser.parse_args(argv)
+    if not args.tutor and not args.groups:
+        parser.error("indica --tutor o --groups")
+    configure_cli_logging()
+    return asyncio.run(_run_cli(args))
+
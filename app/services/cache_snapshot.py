@@ -0,0 +1,99 @@
+import base64
+from datetime import datetime
+import gzip
+import json
+import os
+from typing import Optional
+from services.response_record import ResponseRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cabecera y versión del formato; un cambio de versión invalida los snapshots viejos
+SNAPSHOT_MAGIC = b"SERENIA-CACHE"
+SNAPSHOT_VERSION = 5
+
+# Campos que nunca se escriben a disco
+SENSITIVE_FIELDS = {"password"}
+
+
+def to_plain(value):
+    """
+    Convierte valores de Firestore a tipos nativos de Python serializables:
+    fechas con nanosegundos a datetime, referencias a su ruta y el resto a texto.
+    """
+    if value is None or isinstance(value, (str, int, float, bool, bytes, ResponseRecord)):
+        return value
+    if isinstance(value, datetime):
+        return datetime(*value.timetuple()[:6], value.microsecond, tzinfo=value.tzinfo)
+    if isinstance(value, dict):
+        return {k: to_plain(v) for k, v in value.items() if k not in SENSITIVE_FIELDS}
+    if isinstance(value, (list, tuple, set)):
+        return [to_plain(v) for v in value]
+    if hasattr(value, "path"):
+        return value.path
+    return str(value)
+
+
+def _encode(value):
+    """Codifica para JSON los tipos que no son nativos: fechas, respuestas y bytes"""
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, ResponseRecord):
+        return {"$resp": list(value.__getstate__())}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Tipo no serializable en el snapshot: {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    """Reconstruye los valores codificados por _encode; el resto de objetos queda igual"""
+    if len(obj) == 1:
+        if "$dt" in obj:
+            return datetime.fromisoformat(obj["$dt"])
+        if "$resp" in obj:
+            record = ResponseRecord.__new__(ResponseRecord)
+            record.__setstate__(obj["$resp"])
+            return record
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+    return obj
+
+
+def save_snapshot(path: str, state: dict):
+    """
+    Convierte el estado con to_plain y lo escribe en disco como JSON comprimido, de
+    forma atómica y legible solo por el usuario del proceso (0600).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # Un .tmp previo conserva sus permisos al abrirlo; se fuerzan de nuevo
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=5) as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(SNAPSHOT_VERSION.to_bytes(2, "big"))
+        f.write(json.dumps(to_plain(state), default=_encode, separators=(",", ":")).encode("utf-8"))
+    os.replace(tmp_path, path)
+    logger.debug(f"[SNAPSHOT] Guardado en {path}")
+
+
+def load_snapshot(path: str) -> Optional[dict]:
+    """Lee un snapshot del caché; devuelve None si no existe, es de otra versión o está dañado"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rb") as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                logger.warning(f"[SNAPSHOT] Archivo no reconocido: {path}")
+                return None
+            version = int.from_bytes(f.read(2), "big")
+            if version != SNAPSHOT_VERSION:
+                logger.warning(f"[SNAPSHOT] Versión {version} no soportada (se esperaba {SNAPSHOT_VERSION})")
+                return None
+            return json.loads(f.read().decode("utf-8"), object_hook=_decode)
+    except Exception as e:
+        logger.warning(f"[SNAPSHOT] No se pudo leer {path}: {str(e)}")
+        return None
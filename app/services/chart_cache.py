@@ -0,0 +1,73 @@
+from collections import OrderedDict
+import os
+import threading
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Máximo de gráficas PNG que se conservan en memoria
+CHART_CACHE_SIZE = int(os.getenv("SERENIA_CHART_CACHE_SIZE", "512"))
+
+
+def response_fingerprint(responses: list) -> Tuple[int, int]:
+    """
+    Huella de las respuestas de un alumno: (cantidad, hash de id, cuestionario, nivel,
+    puntaje y fecha de cada una). Cambia también si se edita o reemplaza una
+    respuesta sin alterar la cantidad ni la fecha más reciente.
+    """
+    if not responses:
+        return 0, 0
+    return len(responses), hash(tuple((r.doc_id, r.questionnaire, r.level, r.score, r.timestamp) for r in responses))
+
+
+class ChartCache:
+    """
+    Caché LRU acotado de gráficas PNG por alumno. La clave combina el id del alumno
+    con la huella de sus respuestas, así que una respuesta nueva invalida su gráfica
+    sin tocar las demás. Lo comparten todas las rutas que exportan reportes.
+    """
+
+    def __init__(self, max_entries: int = CHART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(user_id: str, fingerprint: Tuple[int, int], name: str = "", period: Optional[str] = None) -> tuple:
+        # El nombre aparece en el título y el periodo limita los puntos de la gráfica
+        return user_id, period, fingerprint, name
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def put(self, key: tuple, png: bytes):
+        with self._lock:
+            # Una entrada anterior del mismo alumno y periodo ya no sirve
+            stale = [k for k in self._entries if k[:2] == key[:2] and k != key]
+            for k in stale:
+                del self._entries[k]
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+chart_cache = ChartCache()
@@ -0,0 +1,10 @@
+import logging
+
+
+def configure_cli_logging(level: int = logging.INFO):
+    """
+    Fija el nivel de logging de las herramientas de línea de comandos. data_cache
+    llama a logging.basicConfig al importarse, así que un basicConfig posterior no
+    tendría efecto: el nivel se aplica directamente al logger raíz.
+    """
+    logging.getLogger().setLevel(level)
@@ -1,7 +1,15 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import asyncio
-from typing import Dict, List
+import bisect
+import heapq
+import os
+import weakref
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from services.firebase_service import db
+from services.cache_snapshot import load_snapshot, save_snapshot
+from services.group_metrics import apply_summary, empty_rollup, rollup_to_metrics, user_summary
+from services.response_record import ResponseRecord
+from services.periods import cuatrimestre_label
 from google.cloud.firestore_v1.base_query import FieldFilter
 import logging
 
@@ -9,6 +17,43 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Colecciones con un campo de actualización que mantienen todos sus escritores: la
+# sincronización solo trae los documentos posteriores a la marca de agua
+SYNC_FIELDS = {
+    "tutors": "updated_at",
+}
+
+# Colecciones de solo altas con la fecha que escribe el cliente (Timestamp o texto
+# ISO): la sincronización trae la ventana desde la última sincronización menos
+# SYNC_LOOKBACK, que absorbe relojes desfasados y escrituras offline. Lo que cae
+# fuera de la ventana, las bajas y los cambios de usuarios llegan con la recarga
+# por edad máxima.
+APPEND_FIELDS = {
+    "respuestas_cuestionarios": "date",
+    "recomendaciones": "fecha",
+}
+SYNC_LOOKBACK = timedelta(seconds=int(os.getenv("SERENIA_SYNC_LOOKBACK", "3600")))
+
+# Máximo de valores admitidos por Firestore en un filtro "in"
+FIRESTORE_IN_LIMIT = 30
+
+# Consultas simultáneas de recomendaciones en una carga acotada por grupos
+RECOMMENDATIONS_CONCURRENCY = 16
+
+# Política de frescura: dentro del TTL se sirve de memoria; entre el TTL y la edad
+# máxima se sirve el dato viejo y se refresca en segundo plano; pasada la edad
+# máxima se recarga antes de responder
+CACHE_TTL = timedelta(seconds=int(os.getenv("SERENIA_CACHE_TTL", "300")))
+CACHE_MAX_AGE = timedelta(seconds=int(os.getenv("SERENIA_CACHE_MAX_AGE", "1800")))
+
+# Snapshot local del caché para arranques en frío
+SNAPSHOT_PATH = os.getenv("SERENIA_CACHE_SNAPSHOT", os.path.join(".cache", "data_cache.snapshot"))
+# Segundos mínimos entre escrituras del snapshot
+SNAPSHOT_INTERVAL = float(os.getenv("SERENIA_CACHE_SNAPSHOT_INTERVAL", "30"))
+
+# Segundos durante los que se agrupan los cambios en vivo antes de notificar
+LIVE_COALESCE_SECONDS = 1.0
+
 class DataCache:
     _instance = None
 
@@ -22,99 +67,791 @@ class DataCache:
         """Inicializa el caché vacío"""
         self.tutors: Dict[str, dict] = {}
         self.users: Dict[str, dict] = {}
-        self.responses: Dict[str, List[dict]] = {}
+        self.responses: Dict[str, List[ResponseRecord]] = {}
+        self.group_index: Dict[str, Dict[str, None]] = {}
+        self.group_rollups: Dict[str, dict] = {}
+        self._user_summaries: Dict[str, tuple] = {}
+        self._period_buckets: Dict[str, dict] = {}
+        # Índice de búsqueda por grupo: [(nombre y student_id en minúsculas, id de usuario)]
+        self._search_index: Dict[str, List[tuple]] = {}
         self.last_update: datetime = None
+        # Última recarga completa o de todos los grupos en caché; de ella se mide max_age
+        self.last_full_load: datetime = None
+        self.fully_loaded = False
+        self.loaded_groups: Set[str] = set()
+        self.sync_marks: Dict[str, datetime] = {}
+        self._listeners = []
+        # Colecciones cuya primera entrega (toda la colección como ADDED) aún no llega
+        self._awaiting_initial: Set[str] = set()
+        self._subscribers: List[weakref.ref] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending_changes: Set[str] = set()
+        self._flush_handle = None
+        self.ttl: timedelta = CACHE_TTL
+        self.max_age: timedelta = CACHE_MAX_AGE
+        self._background_refresh: Optional[asyncio.Task] = None
+        # Puesta al día tras restaurar el snapshot; mientras corre se sirve lo restaurado
+        self._restore_refresh: Optional[asyncio.Task] = None
+        self.snapshot_path: str = SNAPSHOT_PATH
+        self._snapshot_checked = False
+        self._snapshot_lock = asyncio.Lock()
+        self._snapshot_handle: Optional[asyncio.TimerHandle] = None
+        self._last_snapshot = float("-inf")
+        self._refresh_lock = asyncio.Lock()
+        self._inflight: Dict[object, asyncio.Future] = {}
         logger.debug("DataCache inicializado")
 
     async def load_all_data(self):
-        """Carga/actualiza todos los datos desde Firestore"""
+        """
+        Carga/actualiza todos los datos desde Firestore.
+
+        Las llamadas concurrentes esperan a la misma carga en curso en lugar de
+        lanzar otra (single-flight).
+        """
+        await self._single_flight("load_all", self._load_all_data)
+
+    async def _single_flight(self, key, factory: Callable):
+        """
+        Ejecuta factory() una sola vez por clave mientras esté en curso; los demás
+        llamadores esperan el mismo resultado. Las recargas se serializan con un lock
+        para que nunca se mezclen dos escrituras sobre los diccionarios.
+        """
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            async def run():
+                try:
+                    async with self._refresh_lock:
+                        return await factory()
+                finally:
+                    self._inflight.pop(key, None)
+            task = asyncio.ensure_future(run())
+            self._inflight[key] = task
+        else:
+            logger.debug(f"[CACHE] Esperando operación en curso: {key}")
+        return await asyncio.shield(task)
+
+    async def _load_all_data(self):
+        """Construye el caché completo aparte y lo publica con un único intercambio"""
+        previous_marks = self.sync_marks
         try:
             logger.debug("[CACHE] Cargando datos...")
-            await asyncio.gather(
+            started_at = datetime.now(timezone.utc)
+            self.sync_marks = {}
+            tutors, users, responses = await asyncio.gather(
                 self._load_tutors(),
                 self._load_users_and_recommendations(),
                 self._load_responses()
             )
-            self.last_update = datetime.now()
+            group_index = self._build_group_index(users)
+            # Colecciones sin marca observada parten del inicio de esta carga
+            for collection in (*SYNC_FIELDS, *APPEND_FIELDS):
+                self.sync_marks.setdefault(collection, started_at)
+            # Intercambio atómico: ningún lector ve un caché a medio construir
+            self.tutors, self.users, self.responses, self.group_index = tutors, users, responses, group_index
+            self._reset_rollups()
+            self.fully_loaded = True
+            self.loaded_groups = set(group_index)
+            self.last_update = self.last_full_load = datetime.now()
+            self._schedule_snapshot()
             logger.info(f"[CACHE] Datos cargados. Tutores: {len(self.tutors)}, Usuarios: {len(self.users)}, Respuestas: {sum(len(r) for r in self.responses.values())}")
         except Exception as e:
+            self.sync_marks = previous_marks
             logger.error(f"[CACHE ERROR] Error al cargar datos: {str(e)}")
             raise
 
-    async def _load_tutors(self):
+    async def load_tutor_scope(self, tutor_doc):
+        """
+        Carga solo lo que necesita un tutor: su documento, los usuarios de sus grupos
+        y las respuestas y recomendaciones de esos usuarios.
+
+        Si los grupos ya están en caché se limita a sincronizar cambios.
+        """
+        try:
+            self.tutors[tutor_doc.id] = self._build_tutor(tutor_doc)
+            if not await self._ensure_groups_loaded(self.tutors[tutor_doc.id]["groups"]):
+                if self.last_update is not None:
+                    await self.ensure_fresh()
+        except Exception as e:
+            logger.error(f"[CACHE ERROR] Error al cargar datos del tutor {tutor_doc.id}: {str(e)}")
+            raise
+
+    async def load_groups(self, groups: List[str]):
+        """Carga en caché los grupos indicados (p. ej. para exportaciones sin sesión de tutor)"""
+        try:
+            if not await self._ensure_groups_loaded(groups):
+                if self.last_update is not None:
+                    await self.ensure_fresh()
+        except Exception as e:
+            logger.error(f"[CACHE ERROR] Error al cargar grupos {groups}: {str(e)}")
+            raise
+
+    async def _ensure_groups_loaded(self, groups: List[str]) -> bool:
+        """Carga los grupos que aún no estén en caché; devuelve True si tuvo que cargar alguno"""
+        missing = [g for g in groups if g not in self.loaded_groups] if not self.fully_loaded else []
+        if not missing:
+            return False
+        await self._single_flight(("groups", tuple(sorted(missing))), lambda: self._load_groups(missing))
+        return True
+
+    async def _load_groups(self, groups: List[str]):
+        """Carga usuarios, recomendaciones y respuestas de los grupos indicados"""
+        started_at = datetime.now(timezone.utc)
+        users_ref = await self._query_in_chunks(db.collection("users"), "group", groups)
+        user_ids = [user.id for user in users_ref]
+        semaphore = asyncio.Semaphore(RECOMMENDATIONS_CONCURRENCY)
+
+        async def load_recommendations(user_id):
+            async with semaphore:
+                recs = await asyncio.to_thread(
+                    lambda: db.collection("users").document(user_id).collection("recomendaciones").get()
+                )
+            return [self._build_recommendation(rec) for rec in recs]
+
+        responses_ref, recommendations = await asyncio.gather(
+            self._query_in_chunks(db.collection("respuestas_cuestionarios"), "id_user", user_ids),
+            asyncio.gather(*(load_recommendations(user_id) for user_id in user_ids))
+        )
+        responses: Dict[str, List[ResponseRecord]] = {user_id: [] for user_id in user_ids}
+        for response in responses_ref:
+            entry = self._build_response(response)
+            if entry is not None:
+                responses.setdefault(entry["id_user"], []).append(entry)
+        for user_responses in responses.values():
+            user_responses.sort(key=self._response_sort_key)
+        # Publicar los grupos de una vez, sin esperas intermedias
+        fetched_ids = set(user_ids)
+        for group in groups:
+            for user_id in list(self.group_index.get(group, {})):
+                if user_id not in fetched_ids:
+                    self._remove_user(user_id)
+        for user, user_recommendations in zip(users_ref, recommendations):
+            self._upsert_user(user)
+            self.users[user.id]["recommendations"] = user_recommendations
+        self.responses.update(responses)
+        for group in groups:
+            self._invalidate_rollup(group)
+        for user_id in user_ids:
+            self._period_buckets.pop(user_id, None)
+        covers_loaded = self.loaded_groups <= set(groups)
+        for collection in SYNC_FIELDS:
+            self.sync_marks.setdefault(collection, started_at)
+        for collection in APPEND_FIELDS:
+            # Solo una recarga de todo lo cargado adelanta la ventana de las altas
+            if covers_loaded:
+                self.sync_marks[collection] = started_at
+            else:
+                self.sync_marks.setdefault(collection, started_at)
+        self.loaded_groups.update(groups)
+        self.last_update = datetime.now()
+        if covers_loaded:
+            self.last_full_load = self.last_update
+        self._schedule_snapshot()
+        logger.info(f"[CACHE] Grupos cargados {groups}. Usuarios: {len(users_ref)}, Respuestas: {len(responses_ref)}")
+
+    @staticmethod
+    async def _query_in_chunks(source, field: str, values: List[str]) -> list:
+        """Ejecuta en paralelo una consulta "in" por cada bloque de FIRESTORE_IN_LIMIT valores"""
+        chunks = [values[i:i + FIRESTORE_IN_LIMIT] for i in range(0, len(values), FIRESTORE_IN_LIMIT)]
+        results = await asyncio.gather(*(
+            asyncio.to_thread(source.where(filter=FieldFilter(field, "in", chunk)).get)
+            for chunk in chunks
+        ))
+        return [doc for docs in results for doc in docs]
+
+    async def ensure_fresh(self):
+        """
+        Aplica la política de frescura antes de leer del caché.
+
+        Dentro de self.ttl no hace nada; pasado el ttl lanza un refresco en segundo
+        plano y devuelve de inmediato (stale-while-revalidate). Si la última recarga
+        supera self.max_age recarga de forma bloqueante: las sincronizaciones
+        incrementales renuevan last_update pero no last_full_load. En modo en vivo el
+        caché siempre es fresco.
+
+        Tras restaurar el snapshot se sirve lo restaurado sin esperar mientras corre
+        su puesta al día, aunque supere max_age: es el caso normal tras reiniciar y
+        el arranque en frío no debe esperar la recarga completa.
+        """
+        if self.last_update is None:
+            await self.load_all_data()
+            return
+        if self.live:
+            return
+        if self._restore_refresh is not None:
+            if not self._restore_refresh.done():
+                return
+            self._restore_refresh = None
+        if self._load_expired():
+            if self._background_refresh is not None and not self._background_refresh.done():
+                # Ya hay una puesta al día en curso
+                await self._background_refresh
+            if self._load_expired():
+                logger.debug("[CACHE] La última recarga supera la edad máxima; recargando")
+                await self.reload()
+            return
+        age = datetime.now() - self.last_update
+        if age <= self.ttl:
+            return
+        if self._background_refresh is None or self._background_refresh.done():
+            logger.debug(f"[CACHE] Datos con {age.total_seconds():.0f}s, refrescando en segundo plano")
+            self._background_refresh = asyncio.ensure_future(self._revalidate())
+
+    def _load_expired(self) -> bool:
+        """Indica si la última recarga completa o acotada superó self.max_age"""
+        return self.last_full_load is None or datetime.now() - self.last_full_load > self.max_age
+
+    async def reload(self):
+        """
+        Recarga completa de lo que hay en caché: toda la base o los grupos cargados
+        junto con los tutores. Es la ruta de los botones de actualizar.
+        """
+        if self.fully_loaded or not self.loaded_groups:
+            await self.load_all_data()
+            return
+        await self._single_flight("reload", self._reload_groups)
+
+    async def _reload_groups(self):
+        """Recarga los grupos en caché y todos los tutores"""
+        await self._load_groups(sorted(self.loaded_groups))
+        self.tutors = await self._load_tutors()
+
+    async def _revalidate(self):
+        """Refresco en segundo plano; avisa a los suscriptores si llegaron cambios"""
+        try:
+            changed = await self._single_flight("sync", self._sync_changes)
+            if changed:
+                self._queue_changes(changed)
+        except Exception as e:
+            logger.error(f"[CACHE ERROR] Error en el refresco en segundo plano: {str(e)}")
+
+    async def _reload_restored(self):
+        """Recarga en segundo plano un snapshot restaurado que superó max_age y avisa a los suscriptores"""
+        try:
+            await self.reload()
+            self._queue_changes({"tutors", "users", "recomendaciones", "respuestas_cuestionarios"})
+        except Exception as e:
+            logger.error(f"[CACHE ERROR] Error al recargar el snapshot restaurado: {str(e)}")
+
+    async def restore_snapshot(self) -> bool:
+        """
+        Restaura el caché desde el snapshot local (solo una vez por proceso y con el
+        caché vacío) y lanza en segundo plano la puesta al día: la sincronización
+        incremental si el snapshot está dentro de max_age, o si no una recarga, que
+        además descarta lo eliminado mientras el proceso estaba detenido.
+        """
+        if self._snapshot_checked or self.last_update is not None:
+            return False
+        self._snapshot_checked = True
+        state = await asyncio.to_thread(load_snapshot, self.snapshot_path)
+        if not state or self.last_update is not None:
+            return False
+        self.tutors = state["tutors"]
+        self.users = state["users"]
+        self.responses = state["responses"]
+        self.group_index = self._build_group_index(self.users)
+        self._reset_rollups()
+        self.sync_marks = state["sync_marks"]
+        self.fully_loaded = state["fully_loaded"]
+        self.loaded_groups = set(state["loaded_groups"])
+        self.last_update = state["saved_at"]
+        self.last_full_load = state["last_full_load"]
+        refresh = self._reload_restored if self._load_expired() else self._revalidate
+        self._restore_refresh = self._background_refresh = asyncio.ensure_future(refresh())
+        logger.info(f"[CACHE] Snapshot restaurado ({state['saved_at']}). Tutores: {len(self.tutors)}, Usuarios: {len(self.users)}")
+        return True
+
+    def _schedule_snapshot(self):
+        """Programa la escritura del snapshot; agrupa las cargas seguidas en una escritura cada SNAPSHOT_INTERVAL segundos"""
+        if self._snapshot_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        delay = max(0.0, self._last_snapshot + SNAPSHOT_INTERVAL - loop.time())
+        self._snapshot_handle = loop.call_later(delay, self._write_snapshot)
+
+    def _write_snapshot(self):
+        """Copia superficial del estado en el loop; la conversión, compresión y escritura corren en un hilo"""
+        self._snapshot_handle = None
+        self._last_snapshot = asyncio.get_running_loop().time()
+        # Los mapas se reemplazan entrada por entrada, pero las listas de respuestas se
+        # modifican en sitio: se copian para que el hilo no las vea cambiar
+        state = {
+            "saved_at": self.last_update,
+            "last_full_load": self.last_full_load,
+            "tutors": dict(self.tutors),
+            "users": dict(self.users),
+            "responses": {user_id: list(user_responses) for user_id, user_responses in self.responses.items()},
+            "sync_marks": dict(self.sync_marks),
+            "fully_loaded": self.fully_loaded,
+            "loaded_groups": sorted(self.loaded_groups),
+        }
+
+        async def write():
+            try:
+                async with self._snapshot_lock:
+                    await asyncio.to_thread(save_snapshot, self.snapshot_path, state)
+            except Exception as e:
+                logger.error(f"[CACHE ERROR] Error al guardar snapshot: {str(e)}")
+        asyncio.ensure_future(write())
+
+    async def _sync_changes(self):
+        """
+        Sincronización incremental: tutores por marca de agua, respuestas y
+        recomendaciones por ventana de fechas (APPEND_FIELDS). Cada colección falla
+        por separado. Devuelve las colecciones que cambiaron.
+        """
+        logger.debug("[CACHE] Sincronizando cambios...")
+        started_at = datetime.now(timezone.utc)
+
+        async def fetch(collection, factory):
+            try:
+                return await factory()
+            except Exception as e:
+                logger.error(f"[CACHE ERROR] Error al sincronizar {collection}: {str(e)}")
+                return None
+
+        tutors_ref, responses_ref, recs_ref = await asyncio.gather(
+            fetch("tutors", lambda: self._fetch_changed("tutors")),
+            fetch("respuestas_cuestionarios", lambda: self._fetch_appended("respuestas_cuestionarios")),
+            fetch("recomendaciones", lambda: self._fetch_appended("recomendaciones", collection_group=True))
+        )
+        changed = set()
+        if tutors_ref:
+            for tutor in tutors_ref:
+                self.tutors[tutor.id] = self._build_tutor(tutor)
+            changed.add("tutors")
+        if responses_ref is not None:
+            changed.update(await self._apply_appended_responses(responses_ref))
+            self.sync_marks["respuestas_cuestionarios"] = started_at
+        if recs_ref is not None:
+            if self._apply_appended_recommendations(recs_ref):
+                changed.add("recomendaciones")
+            self.sync_marks["recomendaciones"] = started_at
+        self.last_update = datetime.now()
+        if changed:
+            self._schedule_snapshot()
+        logger.info(f"[CACHE] Cambios sincronizados: {sorted(changed) or 'ninguno'}")
+        return changed
+
+    async def _fetch_appended(self, collection: str, collection_group: bool = False) -> list:
+        """
+        Documentos de una colección de solo altas con fecha desde la última
+        sincronización menos SYNC_LOOKBACK. Firestore compara por tipo, así que la
+        fecha Timestamp y la fecha en texto ISO se consultan por separado.
+        """
+        field = APPEND_FIELDS[collection]
+        mark = self.sync_marks.get(collection)
+        if mark is None:
+            logger.debug(f"[CACHE] {collection} sin marca de sincronización; llega con la próxima recarga")
+            return []
+        since = mark - SYNC_LOOKBACK
+        source = db.collection_group(collection) if collection_group else db.collection(collection)
+        by_timestamp, by_text = await asyncio.gather(
+            asyncio.to_thread(source.where(filter=FieldFilter(field, ">=", since)).get),
+            asyncio.to_thread(source.where(filter=FieldFilter(field, ">=", since.strftime("%Y-%m-%dT%H:%M:%S"))).get)
+        )
+        return list({doc.reference.path: doc for doc in [*by_timestamp, *by_text]}.values())
+
+    async def _apply_appended_responses(self, docs) -> Set[str]:
+        """
+        Aplica las respuestas de la ventana que aún no están (o cambiaron) en caché.
+        Un id_user desconocido es un alumno nuevo: se trae y se agrega si su grupo
+        está en caché. Devuelve las colecciones que cambiaron.
+        """
+        entries = []
+        for doc in docs:
+            entry = self._build_response(doc)
+            if entry is None:
+                continue
+            current = next((r for r in self.responses.get(entry.id_user, []) if r.doc_id == entry.doc_id), None)
+            if current is None or self._response_values(current) != self._response_values(entry):
+                entries.append(entry)
+        changed = set()
+        unknown = sorted({entry.id_user for entry in entries if entry.id_user not in self.users})
+        if unknown and await self._add_new_users(unknown):
+            changed.add("users")
+        entries = [entry for entry in entries if entry.id_user in self.users]
+        if entries:
+            self._merge_responses(entries)
+            changed.add("respuestas_cuestionarios")
+        return changed
+
+    async def _add_new_users(self, user_ids: List[str]) -> bool:
+        """Trae en un solo lote los alumnos indicados y agrega los que pertenecen a grupos en caché"""
+        refs = [db.collection("users").document(user_id) for user_id in user_ids]
+        docs = await asyncio.to_thread(lambda: list(db.get_all(refs)))
+        added = False
+        for doc in docs:
+            if not doc.exists:
+                continue
+            if self.fully_loaded or (doc.to_dict() or {}).get("group", "") in self.loaded_groups:
+                self._upsert_user(doc)
+                added = True
+        return added
+
+    def _apply_appended_recommendations(self, docs) -> bool:
+        """Aplica las recomendaciones de la ventana de alumnos en caché; devuelve True si alguna cambió"""
+        changed = False
+        for rec in docs:
+            user = self.users.get(self._get_recommendation_user_id(rec))
+            if user is None:
+                continue
+            current = next((r for r in user.get("recommendations", []) if r.get("doc_id") == rec.id), None)
+            if current != self._build_recommendation(rec):
+                self._merge_recommendation(rec)
+                changed = True
+        return changed
+
+    @staticmethod
+    def _response_values(response: ResponseRecord) -> tuple:
+        """Campos de una respuesta que se comparan para saber si cambió"""
+        return response.questionnaire, response.level, response.score, response.timestamp
+
+    async def _fetch_changed(self, collection: str) -> list:
+        """Obtiene los documentos de una colección posteriores a su marca de agua"""
+        field = SYNC_FIELDS[collection]
+        mark = self.sync_marks.get(collection)
+        query = db.collection(collection).where(filter=FieldFilter(field, ">", mark)).order_by(field)
+        docs = await asyncio.to_thread(query.get)
+        for doc in docs:
+            self._advance_mark(collection, doc.to_dict().get(field))
+        return docs
+
+    def _advance_mark(self, collection: str, value):
+        """Sube la marca de agua de una colección si el valor es más reciente"""
+        if not isinstance(value, datetime):
+            return
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        mark = self.sync_marks.get(collection)
+        if mark is None or value > mark:
+            self.sync_marks[collection] = value
+
+    def _build_tutor(self, tutor) -> dict:
+        """Convierte un documento de tutor en su entrada de caché"""
+        tutor_data = tutor.to_dict()
+        self._advance_mark("tutors", tutor_data.get(SYNC_FIELDS["tutors"]))
+        return {
+            **tutor_data,
+            "doc_id": tutor.id,
+            "groups": tutor_data.get("groups", [])
+        }
+
+    def _build_user(self, user) -> dict:
+        """Convierte un documento de usuario en su entrada de caché (sin recomendaciones)"""
+        user_data = user.to_dict()
+        user_data["doc_id"] = user.id
+        user_data["group"] = user_data.get("group", "")
+        return user_data
+
+    def _build_recommendation(self, rec) -> dict:
+        """Convierte un documento de recomendación en su entrada de caché"""
+        rec_data = rec.to_dict()
+        return {
+            **rec_data,
+            "doc_id": rec.id,
+            "fecha": rec_data.get("fecha", datetime.now())
+        }
+
+    def _build_response(self, response) -> Optional[ResponseRecord]:
+        """Convierte un documento de respuesta en su registro compacto de caché, o None si es inválido"""
+        resp_data = response.to_dict()
+        if not resp_data.get("id_user"):
+            logger.warning(f"[CACHE] Respuesta sin id_user: {response.id}")
+            return None
+        # La fecha se normaliza a UTC una sola vez, aquí
+        try:
+            return ResponseRecord.from_dict(response.id, resp_data)
+        except ValueError:
+            logger.warning(f"[CACHE] Formato de fecha inválido en respuesta {response.id}")
+            return None
+
+    def _merge_recommendation(self, rec):
+        """Inserta o reemplaza una recomendación en el usuario al que pertenece"""
+        user_id = self._get_recommendation_user_id(rec)
+        user = self.users.get(user_id)
+        if user is None:
+            return
+        recommendations = [r for r in user.get("recommendations", []) if r.get("doc_id") != rec.id]
+        recommendations.append(self._build_recommendation(rec))
+        user["recommendations"] = recommendations
+
+    def _upsert_user(self, user):
+        """Inserta o reemplaza un usuario conservando sus recomendaciones y el índice de grupos"""
+        previous = self.users.get(user.id, {})
+        user_data = self._build_user(user)
+        user_data["recommendations"] = previous.get("recommendations", [])
+        if previous and previous.get("group") != user_data["group"]:
+            self.group_index.get(previous.get("group"), {}).pop(user.id, None)
+            self._search_index.pop(previous.get("group"), None)
+        self.users[user.id] = user_data
+        self._search_index.pop(user_data["group"], None)
+        self.group_index.setdefault(user_data["group"], {})[user.id] = None
+        self._refresh_user_rollup(user.id)
+
+    def _remove_user(self, user_id: str):
+        """Elimina un usuario del caché y del índice de grupos"""
+        user = self.users.pop(user_id, None)
+        if user is not None:
+            self.group_index.get(user.get("group"), {}).pop(user_id, None)
+            self._search_index.pop(user.get("group"), None)
+        self._refresh_user_rollup(user_id)
+
+    def _reset_rollups(self):
+        """Descarta los acumuladores de métricas, los buckets por periodo y los índices de búsqueda; se reconstruyen al pedirlos"""
+        self.group_rollups = {}
+        self._user_summaries = {}
+        self._period_buckets = {}
+        self._search_index = {}
+
+    def _invalidate_rollup(self, group: str):
+        """Descarta el acumulador y el índice de búsqueda de un grupo y las contribuciones de sus alumnos"""
+        self.group_rollups.pop(group, None)
+        self._search_index.pop(group, None)
+        for user_id in [uid for uid, (g, _) in self._user_summaries.items() if g == group]:
+            del self._user_summaries[user_id]
+
+    def _refresh_user_rollup(self, user_id: str):
+        """Reemplaza la contribución de un alumno en el acumulador de su grupo, si existe"""
+        previous = self._user_summaries.pop(user_id, None)
+        if previous is not None:
+            group, summary = previous
+            if group in self.group_rollups:
+                apply_summary(self.group_rollups[group], user_id, summary, -1)
+        user = self.users.get(user_id)
+        if user is None or user.get("group") not in self.group_rollups:
+            return
+        summary = user_summary(user, self.responses.get(user_id, []))
+        apply_summary(self.group_rollups[user["group"]], user_id, summary, 1)
+        self._user_summaries[user_id] = (user["group"], summary)
+
+    @staticmethod
+    def _build_group_index(users: Dict[str, dict]) -> Dict[str, Dict[str, None]]:
+        """Construye el índice grupo → ids de usuario a partir de un mapa de usuarios"""
+        group_index: Dict[str, Dict[str, None]] = {}
+        for user_id, user_data in users.items():
+            group_index.setdefault(user_data.get("group", ""), {})[user_id] = None
+        return group_index
+
+    @staticmethod
+    def _response_sort_key(response: ResponseRecord) -> float:
+        """Clave de orden cronológico de una respuesta (epoch en segundos, 0 si no tiene fecha)"""
+        return response.timestamp
+
+    @property
+    def live(self) -> bool:
+        """Indica si los listeners en tiempo real están activos"""
+        return bool(self._listeners)
+
+    def start_live_updates(self, loop: asyncio.AbstractEventLoop = None):
+        """
+        Activa el modo en vivo: adjunta listeners on_snapshot a tutores, usuarios,
+        recomendaciones y respuestas y aplica los cambios al caché conforme llegan.
+
+        Los callbacks de Firestore corren en un hilo propio, así que cada cambio se
+        reenvía al event loop antes de tocar los diccionarios. La primera entrega de
+        cada listener repite lo que el caché ya cargó y se descarta.
+        """
+        if self._listeners:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._awaiting_initial = {"tutors", "users", "recomendaciones", "respuestas_cuestionarios"}
+        self._listeners = [
+            db.collection("tutors").on_snapshot(self._snapshot_handler("tutors")),
+            db.collection("users").on_snapshot(self._snapshot_handler("users")),
+            db.collection_group("recomendaciones").on_snapshot(self._snapshot_handler("recomendaciones")),
+            db.collection("respuestas_cuestionarios").on_snapshot(self._snapshot_handler("respuestas_cuestionarios"))
+        ]
+        logger.info("[CACHE] Modo en vivo activado")
+
+    def stop_live_updates(self):
+        """Desactiva el modo en vivo y cancela los listeners"""
+        for listener in self._listeners:
+            listener.unsubscribe()
+        self._listeners = []
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending_changes.clear()
+        logger.info("[CACHE] Modo en vivo desactivado")
+
+    def subscribe(self, callback: Callable):
+        """
+        Registra un callback (función o corrutina) que recibe el conjunto de
+        colecciones modificadas. Los métodos se guardan con referencia débil para
+        que las vistas descartadas no queden retenidas por el caché.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        self._subscribers.append(ref)
+
+    def _snapshot_handler(self, collection: str):
+        """Crea el callback on_snapshot de una colección"""
+        def on_snapshot(col_snapshot, changes, read_time):
+            if collection in self._awaiting_initial:
+                # Instantánea inicial: se descarta aquí, sin pasar por el event loop
+                self._awaiting_initial.discard(collection)
+                logger.debug(f"[CACHE] Entrega inicial de {collection} omitida ({len(changes)} documentos)")
+                return
+            if self._loop and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._apply_snapshot_changes, collection, changes)
+        return on_snapshot
+
+    def _apply_snapshot_changes(self, collection: str, changes):
+        """Aplica altas, cambios y bajas recibidos de un listener (en el event loop)"""
+        try:
+            if collection == "respuestas_cuestionarios":
+                self._apply_response_changes(changes)
+            for change in changes:
+                doc = change.document
+                removed = change.type.name == "REMOVED"
+                if collection == "tutors":
+                    if removed:
+                        self.tutors.pop(doc.id, None)
+                    else:
+                        self.tutors[doc.id] = self._build_tutor(doc)
+                elif collection == "users":
+                    if removed:
+                        self._remove_user(doc.id)
+                    else:
+                        self._upsert_user(doc)
+                elif collection == "recomendaciones":
+                    if removed:
+                        user = self.users.get(self._get_recommendation_user_id(doc))
+                        if user is not None:
+                            user["recommendations"] = [r for r in user.get("recommendations", []) if r.get("doc_id") != doc.id]
+                    else:
+                        self._merge_recommendation(doc)
+            if changes:
+                self.last_update = datetime.now()
+                self._queue_changes({collection})
+        except Exception as e:
+            logger.error(f"[CACHE ERROR] Error al aplicar cambios en vivo de {collection}: {str(e)}")
+
+    def _apply_response_changes(self, changes):
+        """Aplica un lote de cambios en vivo de respuestas"""
+        entries = []
+        removed: Dict[str, Set[str]] = {}
+        for change in changes:
+            doc = change.document
+            entry = None if change.type.name == "REMOVED" else self._build_response(doc)
+            if entry is not None:
+                entries.append(entry)
+                continue
+            user_id = (doc.to_dict() or {}).get("id_user")
+            if not user_id:
+                # Igual que _build_response: sin id_user no hay lista a la que pertenezca
+                logger.warning(f"[CACHE] Respuesta sin id_user: {doc.id}")
+                continue
+            # Bajas y documentos que dejaron de ser válidos salen de la lista
+            removed.setdefault(user_id, set()).add(doc.id)
+        self._merge_responses(entries, removed)
+
+    def _merge_responses(self, entries: List[ResponseRecord], removed: Optional[Dict[str, Set[str]]] = None):
+        """Inserta o reemplaza respuestas y aplica bajas reconstruyendo una sola vez la lista de cada usuario afectado"""
+        touched: Dict[str, Set[str]] = {user_id: set(doc_ids) for user_id, doc_ids in (removed or {}).items()}
+        added: Dict[str, List[ResponseRecord]] = {}
+        for entry in entries:
+            touched.setdefault(entry.id_user, set()).add(entry.doc_id)
+            added.setdefault(entry.id_user, []).append(entry)
+        for user_id, doc_ids in touched.items():
+            user_responses = self.responses.setdefault(user_id, [])
+            user_responses[:] = [r for r in user_responses if r.get("doc_id") not in doc_ids]
+            user_responses.extend(added.get(user_id, []))
+            user_responses.sort(key=self._response_sort_key)
+            self._refresh_user_rollup(user_id)
+            self._period_buckets.pop(user_id, None)
+
+    def _queue_changes(self, collections: Set[str]):
+        """Acumula colecciones modificadas y programa una única notificación"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        self._pending_changes.update(collections)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(LIVE_COALESCE_SECONDS, self._flush_changes)
+
+    def _flush_changes(self):
+        """Notifica una sola vez a los suscriptores los cambios agrupados"""
+        self._flush_handle = None
+        changed = set(self._pending_changes)
+        self._pending_changes.clear()
+        alive = []
+        for ref in self._subscribers:
+            callback = ref()
+            if callback is None:
+                continue
+            alive.append(ref)
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    self._loop.create_task(callback(changed))
+                else:
+                    callback(changed)
+            except Exception as e:
+                logger.error(f"[CACHE ERROR] Error al notificar cambios: {str(e)}")
+        self._subscribers = alive
+        logger.debug(f"[CACHE] Cambios en vivo notificados: {changed}")
+
+    async def _load_tutors(self) -> Dict[str, dict]:
         """Carga todos los tutores desde Firestore"""
         try:
             tutors_ref = await asyncio.to_thread(
                 lambda: db.collection("tutors").get()
             )
-            self.tutors = {
-                tutor.id: {
-                    **tutor.to_dict(),
-                    "doc_id": tutor.id,
-                    "groups": tutor.to_dict().get("groups", [])
-                }
-                for tutor in tutors_ref
-            }
-            logger.debug(f"[CACHE] Cargados {len(self.tutors)} tutores")
+            tutors = {tutor.id: self._build_tutor(tutor) for tutor in tutors_ref}
+            logger.debug(f"[CACHE] Cargados {len(tutors)} tutores")
+            return tutors
         except Exception as e:
             logger.error(f"[CACHE ERROR] Error al cargar tutores: {str(e)}")
             raise
 
-    async def _load_users_and_recommendations(self):
+    async def _load_users_and_recommendations(self) -> Dict[str, dict]:
         """Carga todos los usuarios y sus recomendaciones desde Firestore"""
         try:
-            users_ref = await asyncio.to_thread(
-                lambda: db.collection("users").get()
+            # Una sola consulta collection-group para todas las recomendaciones,
+            # en paralelo con la de usuarios, en lugar de una consulta por usuario
+            users_ref, recommendations_ref = await asyncio.gather(
+                asyncio.to_thread(lambda: db.collection("users").get()),
+                asyncio.to_thread(lambda: db.collection_group("recomendaciones").get())
             )
-            self.users = {}
+            recommendations_by_user: Dict[str, List[dict]] = {}
+            for rec in recommendations_ref:
+                user_id = self._get_recommendation_user_id(rec)
+                if not user_id:
+                    continue
+                recommendations_by_user.setdefault(user_id, []).append(self._build_recommendation(rec))
+            users = {}
             for user in users_ref:
-                user_data = user.to_dict()
-                user_data["doc_id"] = user.id
-                user_data["group"] = user_data.get("group", "")
-                recommendations_ref = await asyncio.to_thread(
-                    lambda: db.collection("users").document(user.id).collection("recomendaciones").get()
-                )
-                user_data["recommendations"] = [
-                    {
-                        **rec.to_dict(),
-                        "doc_id": rec.id,
-                        "fecha": rec.to_dict().get("fecha", datetime.now())
-                    }
-                    for rec in recommendations_ref
-                ]
-                self.users[user.id] = user_data
-            logger.debug(f"[CACHE] Cargados {len(self.users)} usuarios con recomendaciones")
+                user_data = self._build_user(user)
+                user_data["recommendations"] = recommendations_by_user.get(user.id, [])
+                users[user.id] = user_data
+            logger.debug(f"[CACHE] Cargados {len(users)} usuarios con recomendaciones")
+            return users
         except Exception as e:
             logger.error(f"[CACHE ERROR] Error al cargar usuarios y recomendaciones: {str(e)}")
             raise
 
-    async def _load_responses(self):
+    @staticmethod
+    def _get_recommendation_user_id(rec) -> str:
+        """Obtiene el id del usuario padre de una recomendación (users/{id}/recomendaciones/{rec})"""
+        user_ref = rec.reference.parent.parent
+        if user_ref is None or user_ref.parent.id != "users":
+            return None
+        return user_ref.id
+
+    async def _load_responses(self) -> Dict[str, List[ResponseRecord]]:
         """Carga todas las respuestas desde Firestore"""
         try:
             responses_ref = await asyncio.to_thread(
                 lambda: db.collection("respuestas_cuestionarios").get()
             )
-            self.responses = {}
+            responses: Dict[str, List[ResponseRecord]] = {}
             for response in responses_ref:
-                resp_data = response.to_dict()
-                user_id = resp_data.get("id_user")
-                if not user_id:
-                    logger.warning(f"[CACHE] Respuesta sin id_user: {response.id}")
+                entry = self._build_response(response)
+                if entry is None:
                     continue
-                # Convertir date a datetime si es necesario
-                if isinstance(resp_data.get("date"), str):
-                    try:
-                        resp_data["date"] = datetime.fromisoformat(resp_data["date"].replace("Z", "+00:00"))
-                    except ValueError:
-                        logger.warning(f"[CACHE] Formato de fecha inválido en respuesta {response.id}")
-                        continue
-                if user_id not in self.responses:
-                    self.responses[user_id] = []
-                self.responses[user_id].append({
-                    **resp_data,
-                    "doc_id": response.id
-                })
-            logger.debug(f"[CACHE] Cargadas respuestas para {len(self.responses)} usuarios")
+                responses.setdefault(entry["id_user"], []).append(entry)
+            for user_responses in responses.values():
+                user_responses.sort(key=self._response_sort_key)
+            logger.debug(f"[CACHE] Cargadas respuestas para {len(responses)} usuarios")
+            return responses
         except Exception as e:
             logger.error(f"[CACHE ERROR] Error al cargar respuestas: {str(e)}")
             raise
@@ -127,13 +864,44 @@ class DataCache:
 
     def get_users_by_group(self, group: str) -> List[dict]:
         """Obtiene usuarios de un grupo específico desde el caché"""
-        users = [
-            user_data for user_data in self.users.values()
-            if user_data.get("group") == group
-        ]
+        users = [self.users[user_id] for user_id in self.group_index.get(group, {})]
         logger.debug(f"[CACHE] Obtenidos {len(users)} usuarios para el grupo {group}")
         return users
 
+    def search_group_users(self, group: str, query: str = "", offset: int = 0, limit: int = 50) -> Tuple[List[dict], int]:
+        """
+        Busca alumnos de un grupo por nombre o student_id (sin distinguir mayúsculas)
+        y devuelve una página de resultados junto con el total de coincidencias.
+        El índice del grupo se construye al primer uso y se descarta cuando cambian
+        sus alumnos.
+        """
+        index = self._search_index.get(group)
+        if index is None:
+            index = [
+                (f"{self.users[user_id].get('name') or ''}\n{self.users[user_id].get('student_id') or ''}".casefold(), user_id)
+                for user_id in self.group_index.get(group, {})
+            ]
+            self._search_index[group] = index
+        query = (query or "").strip().casefold()
+        matches = [user_id for text, user_id in index if query in text] if query else [user_id for _, user_id in index]
+        return [self.users[user_id] for user_id in matches[offset:offset + limit]], len(matches)
+
+    def get_group_metrics(self, group: str) -> dict:
+        """
+        Obtiene las métricas precalculadas de un grupo (niveles, demografía, promedios
+        y alertas). El acumulador se construye la primera vez y luego se mantiene con
+        cada cambio de alumnos o respuestas. El resultado es de solo lectura.
+        """
+        if group not in self.group_rollups:
+            rollup = empty_rollup()
+            for user_id in self.group_index.get(group, {}):
+                summary = user_summary(self.users[user_id], self.responses.get(user_id, []))
+                apply_summary(rollup, user_id, summary, 1)
+                self._user_summaries[user_id] = (group, summary)
+            self.group_rollups[group] = rollup
+            logger.debug(f"[CACHE] Métricas construidas para el grupo {group}")
+        return rollup_to_metrics(self.group_rollups[group])
+
     def get_user_recommendations(self, user_id: str) -> Dict[str, str]:
         """Obtiene las recomendaciones más recientes de un usuario en formato {cuestionario: recomendacion}"""
         user = self.users.get(user_id, {})
@@ -152,12 +920,42 @@ class DataCache:
         logger.debug(f"[CACHE] Obtenidas recomendaciones para usuario {user_id}: {result}")
         return result
 
-    def get_user_responses(self, user_id: str) -> List[dict]:
-        """Obtiene respuestas de un usuario desde el caché"""
+    def get_user_responses(self, user_id: str) -> List[ResponseRecord]:
+        """Obtiene respuestas de un usuario desde el caché, ordenadas por fecha ascendente"""
         responses = self.responses.get(user_id, [])
-        logger.debug(f"[CACHE] Obtenidas {len(responses)} respuestas para usuario {user_id}: {[r.get('date') for r in responses]}")
+        logger.debug(f"[CACHE] Obtenidas {len(responses)} respuestas para usuario {user_id}")
         return responses
 
+    def get_user_responses_in_range(self, user_id: str, start: datetime, end: datetime) -> List[ResponseRecord]:
+        """Obtiene las respuestas de un usuario con fecha en [start, end] mediante búsqueda binaria"""
+        responses = self.responses.get(user_id, [])
+        lo = bisect.bisect_left(responses, start.timestamp(), key=self._response_sort_key)
+        hi = bisect.bisect_right(responses, end.timestamp(), lo=lo, key=self._response_sort_key)
+        return responses[lo:hi]
+
+    def get_group_responses_in_range(self, group: str, start: datetime, end: datetime) -> List[ResponseRecord]:
+        """Obtiene las respuestas de un grupo con fecha en [start, end], en orden cronológico"""
+        return list(heapq.merge(
+            *(self.get_user_responses_in_range(user_id, start, end) for user_id in self.group_index.get(group, {})),
+            key=self._response_sort_key
+        ))
+
+    def get_user_period_buckets(self, user_id: str) -> dict:
+        """
+        Obtiene las respuestas de un usuario agrupadas por cuatrimestre, en orden
+        cronológico: {"cuatrimestres": {"Ene-Abr 2025": [...]}}.
+        Se calcula una vez y se descarta cuando cambian sus respuestas.
+        """
+        buckets = self._period_buckets.get(user_id)
+        if buckets is None:
+            buckets = {"cuatrimestres": {}}
+            for response in self.responses.get(user_id, []):
+                if response.date is None:
+                    continue
+                buckets["cuatrimestres"].setdefault(cuatrimestre_label(response.date), []).append(response)
+            self._period_buckets[user_id] = buckets
+        return buckets
+
     async def get_tutor_groups(self, tutor_id: str) -> List[str]:
         """Obtiene la lista de grupos de un tutor desde el caché"""
         try:
@@ -177,14 +975,13 @@ class DataCache:
             if not tutor.exists:
                 raise ValueError(f"Tutor {tutor_id} no encontrado")
             groups = tutor.to_dict().get("groups", []) + [group_name]
-            await asyncio.to_thread(tutor_ref.set, {"groups": groups}, merge=True)
+            await asyncio.to_thread(tutor_ref.set, {"groups": groups, "updated_at": datetime.now(timezone.utc)}, merge=True)
             self.tutors[tutor_id] = {
                 **tutor.to_dict(),
                 "doc_id": tutor_id,
                 "groups": groups
             }
-            self.users.clear()  # Invalidar caché de usuarios
-            self.responses.clear()  # Invalidar respuestas
+            await self._ensure_groups_loaded([group_name])
             logger.info(f"[CACHE] Grupo {group_name} agregado al tutor {tutor_id}")
         except Exception as e:
             logger.error(f"[CACHE ERROR] Error al agregar grupo {group_name} al tutor {tutor_id}: {str(e)}")
@@ -201,14 +998,15 @@ class DataCache:
             if old_group_name not in groups:
                 raise ValueError(f"Grupo {old_group_name} no encontrado")
             groups[groups.index(old_group_name)] = new_group_name
-            await asyncio.to_thread(tutor_ref.set, {"groups": groups}, merge=True)
+            await asyncio.to_thread(tutor_ref.set, {"groups": groups, "updated_at": datetime.now(timezone.utc)}, merge=True)
             self.tutors[tutor_id] = {
                 **tutor.to_dict(),
                 "doc_id": tutor_id,
                 "groups": groups
             }
-            self.users.clear()  # Invalidar caché de usuarios
-            self.responses.clear()  # Invalidar respuestas
+            # Los alumnos conservan su campo group; el grupo anterior sigue en caché
+            # para otros tutores y solo se trae el nuevo si aún no está cargado
+            await self._ensure_groups_loaded([new_group_name])
             logger.info(f"[CACHE] Grupo {old_group_name} actualizado a {new_group_name} para tutor {tutor_id}")
         except Exception as e:
             logger.error(f"[CACHE ERROR] Error al actualizar grupo {old_group_name} a {new_group_name} para tutor {tutor_id}: {str(e)}")
@@ -225,14 +1023,13 @@ class DataCache:
             if group_name not in groups:
                 raise ValueError(f"Grupo {group_name} no encontrado")
             groups.remove(group_name)
-            await asyncio.to_thread(tutor_ref.set, {"groups": groups}, merge=True)
+            await asyncio.to_thread(tutor_ref.set, {"groups": groups, "updated_at": datetime.now(timezone.utc)}, merge=True)
             self.tutors[tutor_id] = {
                 **tutor.to_dict(),
                 "doc_id": tutor_id,
                 "groups": groups
             }
-            self.users.clear()  # Invalidar caché de usuarios
-            self.responses.clear()  # Invalidar respuestas
+            # Solo cambia la configuración del tutor; los datos del grupo siguen válidos
             logger.info(f"[CACHE] Grupo {group_name} eliminado del tutor {tutor_id}")
         except Exception as e:
             logger.error(f"[CACHE ERROR] Error al eliminar grupo {group_name} del tutor {tutor_id}: {str(e)}")
@@ -0,0 +1,127 @@
+from typing import Dict, List, Optional
+
+# Cuestionarios evaluados y categorías demográficas del dashboard
+QUESTIONNAIRES = ("BAI", "BDI", "PSS")
+GENDERS = ("Masculino", "Femenino", "Otro")
+AGE_BUCKETS = ("<18", "18-20", "21-23", ">23")
+
+
+def empty_level_counts() -> Dict[str, List[int]]:
+    return {q: [0, 0, 0, 0] for q in QUESTIONNAIRES}
+
+
+def empty_metrics() -> dict:
+    """Métricas de un grupo sin alumnos"""
+    return {
+        "total_students": 0,
+        "bai_avg": 0,
+        "bdi_avg": 0,
+        "pss_avg": 0,
+        "level_counts": empty_level_counts(),
+        "alerts": [],
+        "gender_groups": {},
+        "age_groups": {}
+    }
+
+
+def age_bucket(age) -> str:
+    """Clasifica la edad en los rangos del filtro del dashboard (sin edad cuenta como >23)"""
+    try:
+        age = int(age) if age not in (None, "") else None
+    except (TypeError, ValueError):
+        age = None
+    if age is None:
+        return ">23"
+    if age < 18:
+        return "<18"
+    if age <= 20:
+        return "18-20"
+    if age <= 23:
+        return "21-23"
+    return ">23"
+
+
+def user_summary(user: dict, responses: List[dict]) -> dict:
+    """
+    Resume la contribución de un alumno a las métricas de su grupo: el nivel de la
+    respuesta más reciente de cada cuestionario (0 si no tiene) y sus datos demográficos.
+    Espera las respuestas ordenadas por fecha ascendente, como las guarda DataCache.
+    """
+    levels: Dict[str, int] = {}
+    for response in reversed(responses):
+        questionnaire = response.get("questionnaire", "")
+        if questionnaire in QUESTIONNAIRES and questionnaire not in levels:
+            levels[questionnaire] = min(max(int(response.get("level", 0) or 0), 0), 3)
+            if len(levels) == len(QUESTIONNAIRES):
+                break
+    return {
+        "name": user.get("name", "Sin nombre"),
+        "gender": user.get("gender", "Otro"),
+        "age_key": age_bucket(user.get("age")),
+        "levels": {q: levels.get(q, 0) for q in QUESTIONNAIRES}
+    }
+
+
+def empty_rollup() -> dict:
+    """Acumulador incremental de las métricas de un grupo"""
+    return {
+        "total_students": 0,
+        "level_counts": empty_level_counts(),
+        "gender_groups": {g: empty_level_counts() for g in GENDERS},
+        "age_groups": {a: empty_level_counts() for a in AGE_BUCKETS},
+        "score_sums": {q: 0 for q in QUESTIONNAIRES},
+        "score_counts": {q: 0 for q in QUESTIONNAIRES},
+        "alerts": {}
+    }
+
+
+def apply_summary(rollup: dict, user_id: str, summary: dict, sign: int):
+    """Suma (sign=1) o resta (sign=-1) la contribución de un alumno al acumulador"""
+    rollup["total_students"] += sign
+    for q, level in summary["levels"].items():
+        rollup["level_counts"][q][level] += sign
+        if summary["gender"] in rollup["gender_groups"]:
+            rollup["gender_groups"][summary["gender"]][q][level] += sign
+        rollup["age_groups"][summary["age_key"]][q][level] += sign
+        if level > 0:
+            rollup["score_sums"][q] += sign * level * 10
+            rollup["score_counts"][q] += sign
+    if sign < 0:
+        rollup["alerts"].pop(user_id, None)
+        return
+    alert = build_alert(summary)
+    if alert:
+        rollup["alerts"][user_id] = alert
+
+
+def build_alert(summary: dict) -> Optional[dict]:
+    """Alerta de un alumno con algún cuestionario en nivel 2 o 3, o None"""
+    alert_levels = [f"{q} (Nivel {level})" for q, level in summary["levels"].items() if level >= 2]
+    if not alert_levels:
+        return None
+    return {
+        "student_name": summary["name"],
+        "questionnaires": ", ".join(alert_levels),
+        "highest_level": max(summary["levels"].values())
+    }
+
+
+def rollup_to_metrics(rollup: Optional[dict]) -> dict:
+    """Devuelve las métricas del acumulador con el formato que consume el dashboard"""
+    if not rollup or rollup["total_students"] == 0:
+        return empty_metrics()
+
+    def average(q):
+        count = rollup["score_counts"][q]
+        return rollup["score_sums"][q] / count if count else 0
+
+    return {
+        "total_students": rollup["total_students"],
+        "bai_avg": average("BAI"),
+        "bdi_avg": average("BDI"),
+        "pss_avg": average("PSS"),
+        "level_counts": rollup["level_counts"],
+        "alerts": list(rollup["alerts"].values()),
+        "gender_groups": rollup["gender_groups"],
+        "age_groups": rollup["age_groups"]
+    }
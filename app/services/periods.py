@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+
+# Abreviaturas de mes que usan las gráficas y los cuatrimestres
+MONTH_NAMES = {
+    1: "Ene", 2: "Feb", 3: "Mar", 4: "Abr", 5: "May", 6: "Jun",
+    7: "Jul", 8: "Ago", 9: "Sep", 10: "Oct", 11: "Nov", 12: "Dic"
+}
+
+# Cuatrimestres del calendario escolar: (primer mes, último mes)
+CUATRIMESTRES = {
+    "Ene-Abr": (1, 4),
+    "May-Ago": (5, 8),
+    "Sep-Dic": (9, 12),
+}
+
+
+def cuatrimestre_label(date: datetime) -> str:
+    """Cuatrimestre de una fecha con el formato del selector, p. ej. "Ene-Abr 2025\""""
+    for name, (first, last) in CUATRIMESTRES.items():
+        if first <= date.month <= last:
+            return f"{name} {date.year}"
+    raise ValueError(f"Mes inválido: {date.month}")
+
+
+def cuatrimestre_range(label: str) -> Tuple[datetime, datetime]:
+    """Inicio y fin (inclusivos, en UTC) de un cuatrimestre con el formato del selector, p. ej. "Ene-Abr 2025\""""
+    name, year = label.rsplit(" ", 1)
+    first, last = CUATRIMESTRES[name]
+    year = int(year)
+    start = datetime(year, first, 1, tzinfo=timezone.utc)
+    end = datetime(year + last // 12, last % 12 + 1, 1, tzinfo=timezone.utc) - timedelta(microseconds=1)
+    return start, end
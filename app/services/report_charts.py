@@ -0,0 +1,54 @@
+import io
+import threading
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Este módulo se ejecuta en los procesos del pool de reportes y solo depende de
+# matplotlib. Los workers también reimportan el módulo principal (__mp_main__), por
+# eso main.py y export_reports.py importan la aplicación solo bajo su guarda
+# __main__. Usa la API orientada a objetos con el backend Agg, sin pyplot ni estado
+# global de GUI.
+
+# Colores de las series (mismos que la paleta de FilterContent)
+CHART_COLORS = {
+    "BAI": "#FFCC80",
+    "BDI": "#90CAF9",
+    "PSS": "#FFAB91",
+}
+SERIES_LABELS = {"BAI": "Ansiedad", "BDI": "Depresión", "PSS": "Estrés"}
+
+# Una figura plantilla por hilo, reutilizada entre gráficas
+_template = threading.local()
+
+
+def _get_template():
+    """Devuelve la figura y los ejes reutilizables del hilo actual"""
+    if not hasattr(_template, "figure"):
+        figure = Figure(figsize=(6, 4))
+        FigureCanvasAgg(figure)
+        _template.figure = figure
+        _template.ax = figure.add_subplot()
+    return _template.figure, _template.ax
+
+
+def render_quarter_chart(user_name: str, quarters: dict) -> bytes:
+    """Dibuja los niveles por cuatrimestre de un alumno y devuelve la imagen PNG"""
+    fig, ax = _get_template()
+    ax.clear()
+    quarter_list = sorted(quarters.keys())
+    for q in ("BAI", "BDI", "PSS"):
+        levels = [quarters[quarter][q] for quarter in quarter_list]
+        ax.plot(quarter_list, levels, label=SERIES_LABELS[q], color=CHART_COLORS[q], marker='o', linestyle='-', linewidth=2)
+    ax.set_title(f"Niveles por Cuatrimestre - {user_name}", fontsize=12, fontweight='bold', pad=10)
+    ax.set_xlabel("Cuatrimestre", fontsize=10)
+    ax.set_ylabel("Nivel", fontsize=10)
+    ax.set_ylim(0, 3)
+    ax.set_yticks([0, 1, 2, 3])
+    ax.set_yticklabels(['Bajo', 'Leve', 'Moderado', 'Alto'], fontsize=9)
+    ax.legend(loc='upper left', fontsize=9)
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.tick_params(axis='x', labelrotation=45, labelsize=9)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches='tight', dpi=150)
+    return buffer.getvalue()
@@ -0,0 +1,238 @@
+from datetime import datetime
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+from docx import Document
+from docx.shared import Inches, Pt
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from services.data_cache import DataCache
+from services.report_charts import render_quarter_chart
+from services.chart_cache import ChartCache, chart_cache, response_fingerprint
+from services.report_store import safe_filename
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Procesos que dibujan las gráficas de los reportes en paralelo
+REPORT_WORKERS = int(os.getenv("SERENIA_REPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_chart_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_chart_executor() -> ProcessPoolExecutor:
+    """
+    Pool de procesos compartido para las gráficas. Usa "spawn" para que los workers
+    no hereden los hilos del cliente de Firestore.
+    """
+    global _chart_executor
+    if _chart_executor is None:
+        _chart_executor = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _chart_executor
+
+
+def shutdown_chart_executor():
+    """Cierra el pool de gráficas (para procesos por lotes que terminan al exportar)"""
+    global _chart_executor
+    if _chart_executor is not None:
+        _chart_executor.shutdown(wait=True)
+        _chart_executor = None
+
+
+def _discard_chart_executor(executor: ProcessPoolExecutor):
+    """Descarta un pool roto; el siguiente get_chart_executor() crea uno nuevo"""
+    global _chart_executor
+    if _chart_executor is executor:
+        _chart_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def render_chart(user_name: str, quarters: dict) -> bytes:
+    """
+    Dibuja una gráfica en el pool de procesos. Si un worker murió y rompió el pool
+    (BrokenProcessPool), lo recrea y reintenta una vez.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_chart_executor()
+    try:
+        return await loop.run_in_executor(executor, render_quarter_chart, user_name, quarters)
+    except BrokenProcessPool:
+        logger.warning("[REPORT] El pool de gráficas se rompió; se recrea y se reintenta")
+        _discard_chart_executor(executor)
+        return await loop.run_in_executor(get_chart_executor(), render_quarter_chart, user_name, quarters)
+
+
+def collect_student_data(cache: DataCache, user: dict, period: Optional[str] = None) -> dict:
+    """
+    Extrae del caché los datos de un alumno para el reporte como tipos simples serializables.
+    Si se indica un periodo (p. ej. "Ene-Abr 2025") solo incluye las respuestas de ese cuatrimestre.
+    """
+    user_id = user.get("doc_id", "")
+    last_login = user.get('lastLogin', 'N/A')
+    if isinstance(last_login, datetime):
+        last_login = last_login.strftime("%d %b")
+    all_responses = cache.get_user_responses(user_id)
+    buckets = cache.get_user_period_buckets(user_id)["cuatrimestres"]
+    if period:
+        buckets = {period: buckets[period]} if period in buckets else {}
+        responses = buckets.get(period, [])
+    else:
+        responses = all_responses
+    quarters = {}
+    for quarter, quarter_responses in buckets.items():
+        quarters[quarter] = {"BAI": None, "BDI": None, "PSS": None}
+        for response in quarter_responses:
+            quarters[quarter][response.get("questionnaire", "")] = response.get("level", 0)
+    return {
+        "user_id": user_id,
+        "name": user.get("name", "Sin nombre"),
+        "fingerprint": response_fingerprint(all_responses),
+        "info": [
+            f"Email: {user.get('email', 'Sin email')}",
+            f"Grupo: {user.get('group', 'Sin grupo')}",
+            f"Edad: {user.get('age', 'N/A')}",
+            f"Carrera: {user.get('class', 'N/A')}",
+            f"Género: {user.get('gender', 'N/A')}",
+            f"Activo: {'Sí' if user.get('isActive', False) else 'No'}",
+            f"Último acceso: {last_login}",
+        ],
+        "rows": [
+            (
+                response.date.strftime('%d %b') if response.date else "N/A",
+                response.get("questionnaire", "N/A"),
+                str(response.get("level", "N/A"))
+            )
+            for response in responses
+        ],
+        "quarters": quarters,
+        "recommendations": cache.get_user_recommendations(user_id)
+    }
+
+
+def _set_font(runs, bold: bool = False):
+    for run in runs:
+        run.font.size = Pt(10)
+        run.font.name = 'Arial'
+        if bold:
+            run.bold = True
+
+
+def build_report_docx(group: str, students: List[dict], charts: Dict[str, bytes], period: Optional[str] = None) -> bytes:
+    """Arma el documento Word del grupo con las gráficas ya renderizadas y lo devuelve en bytes"""
+    doc = Document()
+    # Cover page
+    doc.add_heading("Reporte de Evaluaciones Psicológicas", 0).alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(f"Grupo: {group}", style='Heading 2').alignment = WD_ALIGN_PARAGRAPH.CENTER
+    if period:
+        doc.add_paragraph(f"Periodo: {period}", style='Heading 3').alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph(f"Fecha: {datetime.now().strftime('%d %b %Y %H:%M')}", style='Heading 3').alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_paragraph("Generado por SERENIA Tutores", style='Normal').alignment = WD_ALIGN_PARAGRAPH.CENTER
+    doc.add_page_break()
+
+    rec_map = {"BAI": "Ansiedad", "BDI": "Depresión", "PSS": "Estrés"}
+    for student in students:
+        # Student section
+        doc.add_heading(f"Alumno: {student['name']}", level=1)
+        for line in student["info"]:
+            doc.add_paragraph(line)
+
+        # Results table
+        if student["rows"]:
+            doc.add_heading("Resultados de Cuestionarios", level=2)
+            table = doc.add_table(rows=1, cols=3)
+            table.style = 'Table Grid'
+            table.autofit = True
+            hdr_cells = table.rows[0].cells
+            for i, header in enumerate(['Fecha', 'Cuestionario', 'Nivel']):
+                hdr_cells[i].text = header
+                _set_font(hdr_cells[i].paragraphs[0].runs, bold=True)
+            for row in student["rows"]:
+                row_cells = table.add_row().cells
+                for cell, value in zip(row_cells, row):
+                    cell.text = value
+                    _set_font(cell.paragraphs[0].runs)
+
+        # Chart
+        chart = charts.get(student["user_id"])
+        if chart:
+            doc.add_heading("Gráfico de Niveles", level=2)
+            doc.add_picture(io.BytesIO(chart), width=Inches(5.5))
+
+        # Recommendations
+        doc.add_heading("Recomendaciones", level=2)
+        for questionnaire, text in student["recommendations"].items():
+            name = rec_map.get(questionnaire, questionnaire)
+            doc.add_paragraph(f"{name}:", style='List Bullet')
+            p = doc.add_paragraph(text if text != "N/A" else "No hay recomendación disponible")
+            p.paragraph_format.left_indent = Inches(0.5)
+            _set_font(p.runs)
+        if not student["rows"]:
+            doc.add_paragraph("No hay datos de cuestionarios disponibles.")
+        doc.add_page_break()
+
+    output_stream = io.BytesIO()
+    doc.save(output_stream)
+    return output_stream.getvalue()
+
+
+async def notify_progress(on_progress: Optional[Callable], *args):
+    """Llama al callback de progreso, sea función o corrutina; sin callback no hace nada"""
+    if on_progress is None:
+        return
+    if asyncio.iscoroutinefunction(on_progress):
+        await on_progress(*args)
+    else:
+        on_progress(*args)
+
+
+async def generate_group_report(cache: DataCache, group: str, on_progress: Optional[Callable] = None, period: Optional[str] = None) -> Tuple[str, bytes]:
+    """
+    Genera el reporte Word de un grupo sin bloquear el event loop: las gráficas se
+    dibujan en paralelo en el pool de procesos y el documento se arma en un hilo.
+    on_progress(hechos, total) se llama cada vez que termina un alumno. Con period
+    el reporte se limita a ese cuatrimestre.
+
+    Returns:
+        tuple: (nombre de archivo, contenido del .docx)
+    """
+    users = cache.get_users_by_group(group)
+    students = [collect_student_data(cache, user, period) for user in users]
+    total = len(students)
+
+    async def render(student, key):
+        png = await render_chart(student["name"], student["quarters"])
+        chart_cache.put(key, png)
+        return student["user_id"], png
+
+    # Las gráficas de alumnos sin respuestas nuevas salen del caché
+    charts: Dict[str, bytes] = {}
+    pending = []
+    for student in students:
+        if not student["quarters"]:
+            continue
+        key = ChartCache.make_key(student["user_id"], student["fingerprint"], student["name"], period)
+        png = chart_cache.get(key)
+        if png is None:
+            pending.append(render(student, key))
+        else:
+            charts[student["user_id"]] = png
+    done = total - len(pending)
+    await notify_progress(on_progress, done, total)
+    for next_chart in asyncio.as_completed(pending):
+        user_id, png = await next_chart
+        charts[user_id] = png
+        done += 1
+        await notify_progress(on_progress, done, total)
+
+    content = await asyncio.to_thread(build_report_docx, group, students, charts, period)
+    period_tag = f"_{period.replace(' ', '_')}" if period else ""
+    # El grupo lo define el tutor: el nombre se limpia antes de llegar al disco
+    filename = safe_filename(f"Reporte_{group}{period_tag}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx")
+    logger.info(f"[REPORT] Reporte generado para grupo {group}: {total} alumnos, {len(charts)} gráficas ({len(pending)} dibujadas)")
+    return filename, content
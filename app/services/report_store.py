@@ -0,0 +1,87 @@
+import asyncio
+import os
+import re
+import secrets
+import shutil
+import time
+from urllib.parse import quote
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Carpeta de assets que sirve Flet; los reportes viven en su subcarpeta de descargas
+ASSETS_DIR = os.getenv("SERENIA_ASSETS_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets"))
+DOWNLOADS_SUBDIR = "downloads"
+# Segundos que un reporte queda disponible para descargar
+REPORT_TTL = float(os.getenv("SERENIA_REPORT_TTL", "600"))
+
+
+def safe_filename(name: str) -> str:
+    """
+    Nombre de archivo seguro para el disco a partir de datos del usuario (p. ej. un
+    grupo "3/A"): separadores de ruta y caracteres reservados pasan a "_".
+    """
+    name = re.sub(r"[^\w\-. ]", "_", name).strip(" .")
+    return name or "reporte"
+
+
+class ReportStore:
+    """
+    Almacén temporal de reportes en el servidor. Cada reporte se guarda en una
+    carpeta con un token aleatorio dentro de los assets de Flet y se sirve con una
+    URL corta que deja de existir al expirar, en lugar de viajar en base64 por el
+    websocket de la sesión.
+    """
+
+    def __init__(self, assets_dir: str = ASSETS_DIR, ttl: float = REPORT_TTL):
+        self.root = os.path.join(assets_dir, DOWNLOADS_SUBDIR)
+        self.ttl = ttl
+
+    def _write(self, token: str, filename: str, content: bytes) -> str:
+        folder = os.path.join(self.root, token)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, filename)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _remove(self, token: str):
+        shutil.rmtree(os.path.join(self.root, token), ignore_errors=True)
+
+    def sweep(self) -> int:
+        """Elimina los reportes expirados, incluidos los que quedaron de ejecuciones anteriores"""
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        now = time.time()
+        for token in os.listdir(self.root):
+            try:
+                if now - os.path.getmtime(os.path.join(self.root, token)) > self.ttl:
+                    self._remove(token)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"[REPORT] {removed} reportes expirados eliminados")
+        return removed
+
+    async def publish(self, filename: str, content: bytes) -> str:
+        """
+        Guarda un reporte y devuelve la URL relativa para descargarlo.
+        El archivo se elimina automáticamente pasado el TTL.
+        """
+        token = secrets.token_urlsafe(16)
+        filename = safe_filename(filename)
+        try:
+            await asyncio.to_thread(self.sweep)
+            await asyncio.to_thread(self._write, token, filename, content)
+        except Exception as e:
+            logger.error(f"[REPORT ERROR] Error al guardar reporte {filename}: {str(e)}")
+            raise
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.ttl, lambda: loop.run_in_executor(None, self._remove, token))
+        logger.info(f"[REPORT] Reporte {filename} disponible por {int(self.ttl)} s")
+        return f"/{DOWNLOADS_SUBDIR}/{token}/{quote(filename)}"
+
+
+report_store = ReportStore()
@@ -0,0 +1,86 @@
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+_FIELDS = ("doc_id", "id_user", "questionnaire", "level", "score", "date", "timestamp")
+
+
+def normalize_date(value) -> Optional[datetime]:
+    """
+    Normaliza la fecha de una respuesta a un datetime nativo en UTC. Acepta texto
+    ISO 8601 (con "Z"), datetimes ingenuos (se asumen UTC) y fechas de Firestore.
+    Lanza ValueError si el texto no es una fecha válida.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Fecha no soportada: {value!r}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return datetime(*value.timetuple()[:6], value.microsecond, tzinfo=timezone.utc)
+
+
+class ResponseRecord:
+    """
+    Respuesta de cuestionario compacta para el caché: solo los campos que usa la
+    aplicación, sin diccionario por instancia y con el código de cuestionario
+    internado. Expone get/[] como un dict para no cambiar a quienes la leen.
+
+    La fecha se normaliza una sola vez al crear el registro: date es un datetime
+    en UTC y timestamp su valor epoch en segundos (0.0 sin fecha), que es la clave
+    de orden y de filtrado por rango.
+    """
+    __slots__ = _FIELDS
+
+    def __init__(self, doc_id: str, id_user: str, questionnaire: str, level: int, score=None, date: Optional[datetime] = None):
+        self.doc_id = doc_id
+        self.id_user = sys.intern(id_user)
+        self.questionnaire = sys.intern((questionnaire or "").strip().upper())
+        self.level = level
+        self.score = score
+        self.date = normalize_date(date)
+        self.timestamp = self.date.timestamp() if self.date else 0.0
+
+    @classmethod
+    def from_dict(cls, doc_id: str, data: dict) -> "ResponseRecord":
+        return cls(
+            doc_id,
+            data.get("id_user"),
+            data.get("questionnaire", ""),
+            data.get("level", 0),
+            data.get("score"),
+            data.get("date")
+        )
+
+    def get(self, key: str, default=None):
+        if key in _FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __getitem__(self, key: str):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FIELDS and getattr(self, key) is not None
+
+    def keys(self):
+        return _FIELDS
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in _FIELDS}
+
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in _FIELDS)
+
+    def __setstate__(self, state):
+        for field, value in zip(_FIELDS, state):
+            setattr(self, field, sys.intern(value) if field in ("id_user", "questionnaire") and value else value)
+
+    def __repr__(self) -> str:
+        return f"ResponseRecord({self.to_dict()!r})"
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import os
+from typing import Dict, List, Optional, Tuple
+from services.chart_cache import response_fingerprint
+from services.response_record import ResponseRecord
+
+QUESTIONNAIRE_ORDER = ("BAI", "BDI", "PSS")
+# Series de alumno/periodo que se conservan en memoria
+SERIES_CACHE_SIZE = int(os.getenv("SERENIA_SERIES_CACHE_SIZE", "256"))
+
+
+def build_series(responses: List[ResponseRecord]) -> dict:
+    """
+    Calcula los datos de la gráfica e historial de un alumno para un conjunto de respuestas:
+    - months: meses (año, mes) con datos, en orden cronológico
+    - levels: {cuestionario: {(año, mes): nivel de la última respuesta del mes}}
+    - history: {cuestionario: [respuestas de más reciente a más antigua]}
+    """
+    levels: Dict[str, Dict[Tuple[int, int], int]] = {q: {} for q in QUESTIONNAIRE_ORDER}
+    history: Dict[str, List[ResponseRecord]] = {q: [] for q in QUESTIONNAIRE_ORDER}
+    latest: Dict[Tuple[str, Tuple[int, int]], float] = {}
+    for r in responses:
+        if r.questionnaire not in levels:
+            continue
+        history[r.questionnaire].append(r)
+        if r.date is None:
+            continue
+        month = (r.date.year, r.date.month)
+        if r.timestamp > latest.get((r.questionnaire, month), float("-inf")):
+            latest[(r.questionnaire, month)] = r.timestamp
+            levels[r.questionnaire][month] = r.level
+    for q in QUESTIONNAIRE_ORDER:
+        history[q].sort(key=lambda r: r.timestamp, reverse=True)
+    months = sorted({month for q_levels in levels.values() for month in q_levels})
+    return {"months": months, "levels": levels, "history": history}
+
+
+class SeriesCache:
+    """
+    Caché LRU de series por (alumno, periodo). Cada entrada guarda la huella de las
+    respuestas con que se calculó, así que se recalcula sola si el alumno responde
+    de nuevo o si se edita o reemplaza alguna de sus respuestas.
+    """
+
+    def __init__(self, max_entries: int = SERIES_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def peek(self, user_id: str, period: str, responses: List[ResponseRecord]) -> Optional[dict]:
+        """Devuelve la serie ya calculada y vigente, o None"""
+        key = (user_id, period)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != response_fingerprint(responses):
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def get(self, user_id: str, period: str, responses: List[ResponseRecord]) -> dict:
+        """Devuelve la serie del alumno y periodo, calculándola si hace falta"""
+        series = self.peek(user_id, period, responses)
+        if series is None:
+            series = build_series(responses)
+            self._entries[(user_id, period)] = (response_fingerprint(responses), series)
+            self._entries.move_to_end((user_id, period))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return series
+
+
+series_cache = SeriesCache()
@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import csv
+import logging
+from typing import Iterable, Iterator, List, Optional, Tuple
+from services.data_cache import DataCache
+from services.cli import configure_cli_logging
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la exportación, una fila por respuesta de cuestionario
+COLUMNS = ["group", "user_id", "name", "gender", "age", "questionnaire", "level", "score", "date"]
+# Filas por lote al escribir Parquet
+PARQUET_BATCH_SIZE = 10000
+
+
+def _as_number(value, cast):
+    """Convierte edad y puntaje a número; los valores vacíos o inválidos quedan en None"""
+    try:
+        return cast(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot_responses(cache: DataCache, groups: Optional[List[str]] = None) -> List[Tuple[str, List[Tuple[dict, list]]]]:
+    """
+    Copia superficial de los grupos, alumnos y listas de respuestas a exportar. Se
+    toma en el event loop para que el hilo de escritura no recorra estructuras que
+    el caché modifica mientras tanto. Sin groups incluye todos los grupos cargados.
+    """
+    return [
+        (group, [
+            (user, list(cache.get_user_responses(user.get("doc_id", ""))))
+            for user in cache.get_users_by_group(group)
+        ])
+        for group in (groups if groups is not None else sorted(cache.group_index))
+    ]
+
+
+def iter_response_rows(snapshot: List[Tuple[str, List[Tuple[dict, list]]]]) -> Iterator[dict]:
+    """
+    Genera las filas de respuestas grupo por grupo a partir de snapshot_responses,
+    sin armar la tabla completa en memoria.
+    """
+    for group, students in snapshot:
+        for user, responses in students:
+            user_id = user.get("doc_id", "")
+            for response in responses:
+                yield {
+                    "group": group,
+                    "user_id": user_id,
+                    "name": user.get("name", ""),
+                    "gender": user.get("gender", ""),
+                    "age": _as_number(user.get("age"), int),
+                    "questionnaire": response.questionnaire,
+                    "level": response.level,
+                    "score": _as_number(response.score, float),
+                    "date": response.date.isoformat() if response.date else None
+                }
+
+
+def write_csv(rows: Iterable[dict], path: str) -> int:
+    """Escribe las filas en un CSV a medida que llegan; devuelve cuántas escribió"""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_parquet(rows: Iterable[dict], path: str, batch_size: int = PARQUET_BATCH_SIZE) -> int:
+    """Escribe las filas en un Parquet por lotes de batch_size; requiere pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("La exportación a Parquet requiere pyarrow (pip install pyarrow)") from e
+    schema = pa.schema([
+        ("group", pa.string()),
+        ("user_id", pa.string()),
+        ("name", pa.string()),
+        ("gender", pa.string()),
+        ("age", pa.int64()),
+        ("questionnaire", pa.string()),
+        ("level", pa.int64()),
+        ("score", pa.float64()),
+        ("date", pa.string()),
+    ])
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+async def export_responses(cache: DataCache, path: str, fmt: str = "csv", groups: Optional[List[str]] = None) -> int:
+    """
+    Exporta las respuestas de los grupos indicados (o de todo el dataset) al formato
+    pedido. La escritura corre en un hilo para no bloquear el event loop.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    try:
+        if groups is None:
+            if not cache.fully_loaded:
+                await cache.load_all_data()
+        else:
+            await cache.load_groups(groups)
+        snapshot = snapshot_responses(cache, groups)
+        count = await asyncio.to_thread(WRITERS[fmt], iter_response_rows(snapshot), path)
+    except Exception as e:
+        logger.error(f"[EXPORT ERROR] Error al exportar respuestas a {path}: {str(e)}")
+        raise
+    logger.info(f"[EXPORT] {count} respuestas exportadas a {path}")
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Exportación tabular sin interfaz: python -m services.tabular_export respuestas.csv --groups A B"""
+    parser = argparse.ArgumentParser(description="Exporta las respuestas de cuestionarios de SERENIA")
+    parser.add_argument("output", help="archivo de salida")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="formato (por defecto según la extensión)")
+    parser.add_argument("--groups", nargs="+", help="grupos a exportar (por defecto todos)")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    configure_cli_logging()
+    count = asyncio.run(export_responses(DataCache(), args.output, fmt, args.groups))
+    print(f"[EXPORT] {count} respuestas en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
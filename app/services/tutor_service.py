@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 import asyncio
 from google.cloud.firestore_v1.base_query import FieldFilter
 from services.firebase_service import db
@@ -32,9 +32,9 @@ async def login_tutor(email: str, password: str) -> dict:
         
         print(f"[AUTH] Tutor autenticado: {email}")
         
-        # 2. Inicializar y cargar caché
+        # 2. Cargar en caché solo los grupos del tutor
         cache = DataCache()
-        await cache.load_all_data()
+        await cache.load_tutor_scope(docs[0])
         
         # 3. Obtener datos del tutor desde el caché
         tutor = cache.get_tutor(docs[0].id)
@@ -106,6 +106,7 @@ async def register_tutor(full_name: str, email: str, password: str, groups: list
             "password": password,  # ¡En producción usar hashing!
             "groups": groups,
             "created_at": datetime.now(),
+            "updated_at": datetime.now(timezone.utc),
             "last_login": None
         }
         
@@ -116,9 +117,9 @@ async def register_tutor(full_name: str, email: str, password: str, groups: list
         
         print(f"[AUTH] Nuevo tutor registrado: {email}")
         
-        # 4. Actualizar caché
+        # 4. Actualizar caché con los cambios
         cache = DataCache()
-        await cache.load_all_data()
+        await cache.reload()
         
         return {
             "success": True,